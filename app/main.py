@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 
 from app.publications.handlers import router as adverts_router
+from app.telegram.handlers import router as telegram_router
 from app.auth.auth import auth_backend, fastapi_users
 from app.auth.handlers import router as auth_router
 from app.auth.schemas import UserReadSchema, UserCreateSchema
@@ -23,3 +24,4 @@ app.include_router(
 
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(adverts_router, prefix="/api/v1")
+app.include_router(telegram_router, prefix="/api/v1")
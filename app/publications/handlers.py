@@ -46,15 +46,23 @@ async def get_tg_token(
 
 
 @router.get("/{pub_id}", response_model=PublicationSchema)
-async def get_publication(pub_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_publication(
+        pub_id: int,
+        session: AsyncSession = Depends(get_async_session),
+        include_archived: bool = Query(default=False),
+):
     """Get Publications by id"""
-    return await get_one_publication(pub_id, session)
+    return await get_one_publication(pub_id, include_archived, session)
 
 
 @router.get("/{pub_id}/price", response_model=AllPricesSchema)
-async def get_publication_prices(pub_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_publication_prices(
+        pub_id: int,
+        session: AsyncSession = Depends(get_async_session),
+        include_archived: bool = Query(default=False),
+):
     """Get Publication prices by id"""
-    prices = await get_all_prices(pub_id, session)
+    prices = await get_all_prices(pub_id, include_archived, session)
     return {"prices": prices}
 
 
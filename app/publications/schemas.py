@@ -45,6 +45,8 @@ class PublicationSchema(BaseModel):
     mileage: str
     car_year: int
     is_active: bool
+    current_price: int | None
+    current_price_date: datetime | None
     site: SiteSchema
     prices: list[PricesSchema]
     images: list[ImagesSchema]
@@ -3,12 +3,15 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.publications.schemas import PublicationSchema, PricesSchema
-from database.models import Publication, PublicationPrice
+from database.models import Publication, PublicationPrice, ArchivedPublication
 
 
 async def get_publications(page: int, size:int, session: AsyncSession) -> list[PublicationSchema]:
     """
-    Retrieves a list of active publications.
+    Retrieves a page of active publications.
+
+    The page is selected by the database, in the order of the ids of
+    the publications, so only ``size`` publications are loaded.
 
     :param page: Number of page.
     :param size: Number of posts per page.
@@ -18,21 +21,25 @@ async def get_publications(page: int, size:int, session: AsyncSession) -> list[P
 
     :raises HTTPException: If no active publications are found (404).
     """
-    offset_min = page * size
-    offset_max = (page + 1) * size
-    result = await session.execute(select(Publication).filter(Publication.is_active == True))
+    result = await session.execute(
+        select(Publication)
+        .filter(Publication.is_active == True)
+        .order_by(Publication.id)
+        .offset(page * size)
+        .limit(size)
+    )
     publications = result.unique().scalars().all()
-    publications = publications[offset_min:offset_max]
     if publications is None:
         raise HTTPException(status_code=404, detail="Publications not found")
     return publications
 
 
-async def get_one_publication(pub_id: int, session: AsyncSession) -> PublicationSchema:
+async def get_one_publication(pub_id: int, include_archived: bool, session: AsyncSession) -> PublicationSchema:
     """
     Retrieves a single publication by its ID.
 
     :param pub_id: The ID of the publication to retrieve.
+    :param include_archived: Whether to look for the publication in the archive too.
     :param session: The asynchronous database session.
 
     :return: A PublicationSchema object representing the requested publication.
@@ -41,16 +48,20 @@ async def get_one_publication(pub_id: int, session: AsyncSession) -> Publication
     """
     publication = await session.execute(select(Publication).filter_by(id=pub_id))
     publication = publication.unique().scalars().first()
+    if publication is None and include_archived:
+        publication = await session.execute(select(ArchivedPublication).filter_by(id=pub_id))
+        publication = publication.unique().scalars().first()
     if publication is None:
         raise HTTPException(status_code=404, detail="Publication not found")
     return publication
 
 
-async def get_all_prices(pub_id: int, session: AsyncSession) -> list[PricesSchema]:
+async def get_all_prices(pub_id: int, include_archived: bool, session: AsyncSession) -> list[PricesSchema]:
     """
     Retrieves all prices associated with a specific publication.
 
     :param pub_id: The ID of the publication for which to retrieve prices.
+    :param include_archived: Whether to look for the publication in the archive too.
     :param session: The asynchronous database session.
 
     :return: A list of PricesSchema objects representing the prices for the specified publication.
@@ -59,6 +70,11 @@ async def get_all_prices(pub_id: int, session: AsyncSession) -> list[PricesSchem
     """
     result = await session.execute(select(Publication).filter(Publication.id == pub_id))
     publication = result.scalars().first()
+    if publication is None and include_archived:
+        result = await session.execute(select(ArchivedPublication).filter(ArchivedPublication.id == pub_id))
+        publication = result.unique().scalars().first()
+        if publication is not None:
+            return publication.prices
     if publication is None:
         raise HTTPException(status_code=404, detail="Publication not found")
     result = await session.execute(select(PublicationPrice).join(Publication).filter_by(id=pub_id))
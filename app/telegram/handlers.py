@@ -0,0 +1,24 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import TG_WEBHOOK_SECRET
+from database.database import get_async_session
+from scrappers.notifications.tg.tg import get_new_ids, link_users
+
+router = APIRouter(prefix="/telegram", tags=["Telegram"])
+
+
+@router.post("/webhook")
+async def telegram_webhook(
+    update: dict,
+    session: AsyncSession = Depends(get_async_session),
+    secret_token: str | None = Header(default=None, alias="X-Telegram-Bot-Api-Secret-Token"),
+):
+    """Receive an update from the Telegram bot and link the user"""
+    if not TG_WEBHOOK_SECRET or not hmac.compare_digest(secret_token or "", TG_WEBHOOK_SECRET):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+    await link_users(get_new_ids([update]), session)
+    await session.commit()
+    return {"ok": True}
@@ -13,3 +13,37 @@ TG_BOT_TOKEN = os.getenv("TG_BOT_TOKEN")
 
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
+
+PARSER_CONCURRENCY = int(os.getenv("PARSER_CONCURRENCY", 5))
+PARSER_RATE = float(os.getenv("PARSER_RATE", 2))
+PARSER_RETRIES = int(os.getenv("PARSER_RETRIES", 3))
+WRITER_CHUNK_SIZE = int(os.getenv("WRITER_CHUNK_SIZE", 500))
+CRAWL_STOP_PAGES = int(os.getenv("CRAWL_STOP_PAGES", 3))
+CRAWL_FULL_INTERVAL = int(os.getenv("CRAWL_FULL_INTERVAL", 24))
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", 0))
+PARSER_BATCH_PAGES = int(os.getenv("PARSER_BATCH_PAGES", 10))
+WRITER_QUEUE_SIZE = int(os.getenv("WRITER_QUEUE_SIZE", 4))
+CRAWL_SHARD_PAGES = int(os.getenv("CRAWL_SHARD_PAGES", 0))
+CRAWL_SHARD_PARALLEL = int(os.getenv("CRAWL_SHARD_PARALLEL", os.cpu_count() or 1))
+CRAWL_MIN_SEEN_SHARE = float(os.getenv("CRAWL_MIN_SEEN_SHARE", 0.5))
+WRITER_COPY_THRESHOLD = int(os.getenv("WRITER_COPY_THRESHOLD", 1000))
+WRITER_COMMIT_CHUNKS = int(os.getenv("WRITER_COMMIT_CHUNKS", 1))
+PRICE_PARTITIONS_AHEAD = int(os.getenv("PRICE_PARTITIONS_AHEAD", 3))
+PRICE_ROLLUP_DAYS = int(os.getenv("PRICE_ROLLUP_DAYS", 0))
+PRICE_ROLLUP_PERIOD = os.getenv("PRICE_ROLLUP_PERIOD", "day")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 100))
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", 10))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 5))
+NOTIFY_RETRY_DELAY = int(os.getenv("NOTIFY_RETRY_DELAY", 60))
+NOTIFY_LEASE = int(os.getenv("NOTIFY_LEASE", 600))
+NOTIFY_RETENTION_DAYS = int(os.getenv("NOTIFY_RETENTION_DAYS", 30))
+TG_API_URL = os.getenv("TG_API_URL", "https://api.telegram.org")
+TG_RATE = float(os.getenv("TG_RATE", 30))
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", 1))
+TG_RETRIES = int(os.getenv("TG_RETRIES", 3))
+NOTIFY_DIGEST = bool(int(os.getenv("NOTIFY_DIGEST", 1)))
+NOTIFY_DIGEST_WINDOW = int(os.getenv("NOTIFY_DIGEST_WINDOW", 300))
+TG_POLL_TIMEOUT = int(os.getenv("TG_POLL_TIMEOUT", 0))
+TG_WEBHOOK_SECRET = os.getenv("TG_WEBHOOK_SECRET")
@@ -5,6 +5,7 @@ from typing import AsyncIterator, Optional
 from fastapi import Depends
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -137,7 +138,9 @@ async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     yield SQLAlchemyUserDatabase(session, User)
 
 
-engine = create_async_engine(DATABASE_URL)
+# Celery tasks run in a thread pool and every task uses its own event loop,
+# so the connections are not pooled between the loops.
+engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
 Session = async_sessionmaker(engine, expire_on_commit=False)
 
 
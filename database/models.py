@@ -2,7 +2,20 @@ from datetime import datetime, UTC
 from typing import List
 
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
-from sqlalchemy import Text, String, Integer, ForeignKey, Boolean, DateTime
+from sqlalchemy import (
+    Text,
+    String,
+    Integer,
+    BigInteger,
+    ForeignKey,
+    Boolean,
+    DateTime,
+    UniqueConstraint,
+    Index,
+    text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.database import Base
@@ -12,13 +25,17 @@ class Site(Base):
     __tablename__ = "sites"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(15))
+    name: Mapped[str] = mapped_column(String(15), unique=True)
     url: Mapped[str] = mapped_column(String(15))
     publications: Mapped[List["Publication"]] = relationship(back_populates="site", cascade="all, delete")
 
 
 class Publication(Base):
     __tablename__ = "publications"
+    __table_args__ = (
+        UniqueConstraint("site_id", "publication_id", name="uq_publications_site_id_publication_id"),
+        Index("ix_publications_active_id", "id", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     publication_id: Mapped[int] = mapped_column(Integer)
@@ -33,6 +50,10 @@ class Publication(Base):
     mileage: Mapped[str] = mapped_column(String(10))
     car_year: Mapped[int] = mapped_column(Integer, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    current_price: Mapped[int] = mapped_column(Integer, nullable=True)
+    current_price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(32), nullable=True)
+    deactivated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     site_id: Mapped[int] = mapped_column(ForeignKey("sites.id"))
     site: Mapped["Site"] = relationship(back_populates="publications", lazy="joined")
@@ -52,10 +73,14 @@ class Publication(Base):
 
 class PublicationPrice(Base):
     __tablename__ = "publication_prices"
+    __table_args__ = (
+        Index("ix_publication_prices_publication_id_price_date", "publication_id", "price_date"),
+        {"postgresql_partition_by": "RANGE (price_date)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     price: Mapped[int] = mapped_column(Integer)
-    price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
 
     publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id"))
     publication: Mapped["Publication"] = relationship(back_populates="prices", lazy="joined")
@@ -67,12 +92,93 @@ class PublicationImage(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     url: Mapped[str] = mapped_column(String)
 
-    publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id"))
+    publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id"), index=True)
     publication: Mapped["Publication"] = relationship(back_populates="images", lazy="joined")
 
 
+class ArchivedPublication(Base):
+    __tablename__ = "archived_publications"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    publication_id: Mapped[int] = mapped_column(Integer)
+    publication_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    link: Mapped[str] = mapped_column(String(75))
+    description: Mapped[str] = mapped_column(Text)
+    engine_type: Mapped[str] = mapped_column(String(50))
+    engine_hp: Mapped[str] = mapped_column(String(10))
+    engine_volume: Mapped[str] = mapped_column(String(10), nullable=True)
+    transmission_type: Mapped[str] = mapped_column(String(10))
+    car_drive: Mapped[str] = mapped_column(String(20))
+    mileage: Mapped[str] = mapped_column(String(10))
+    car_year: Mapped[int] = mapped_column(Integer, nullable=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=False)
+    current_price: Mapped[int] = mapped_column(Integer, nullable=True)
+    current_price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(32), nullable=True)
+    deactivated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    site_id: Mapped[int] = mapped_column(ForeignKey("sites.id"))
+    site: Mapped["Site"] = relationship(lazy="joined")
+
+    prices: Mapped[List["ArchivedPublicationPrice"]] = relationship(lazy="joined", cascade="all, delete")
+    images: Mapped[List["ArchivedPublicationImage"]] = relationship(lazy="joined", cascade="all, delete")
+
+    car_model_id: Mapped[int] = mapped_column(ForeignKey("car_models.id"))
+    car_model: Mapped["CarModel"] = relationship(lazy="joined")
+
+
+class ArchivedPublicationPrice(Base):
+    __tablename__ = "archived_publication_prices"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    price: Mapped[int] = mapped_column(Integer)
+    price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    publication_id: Mapped[int] = mapped_column(ForeignKey("archived_publications.id"), index=True)
+
+
+class ArchivedPublicationImage(Base):
+    __tablename__ = "archived_publication_images"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    url: Mapped[str] = mapped_column(String)
+
+    publication_id: Mapped[int] = mapped_column(ForeignKey("archived_publications.id"), index=True)
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(100), unique=True)
+    price: Mapped[int] = mapped_column(Integer)
+    price_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    status: Mapped[str] = mapped_column(String(10), default="pending", server_default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sent_chat_ids: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), default=list, server_default="{}")
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id", ondelete="CASCADE"))
+
+
+class BotState(Base):
+    __tablename__ = "bot_state"
+
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger)
+
+
 class CarModel(Base):
     __tablename__ = "car_models"
+    __table_args__ = (
+        UniqueConstraint("brand", "model", "generation", name="uq_car_models_brand_model_generation"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     brand: Mapped[str] = mapped_column(String(20))
@@ -88,7 +194,7 @@ class Favorite(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     added_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(UTC))
 
-    publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id"))
+    publication_id: Mapped[int] = mapped_column(ForeignKey("publications.id"), index=True)
     publication: Mapped["Publication"] = relationship(back_populates="favorites", lazy="joined")
 
     users: Mapped[list["User"]] = relationship(secondary="users_favorites", back_populates="favorites", lazy="joined")
@@ -98,7 +204,7 @@ class UsersFavorites(Base):
     __tablename__ = "users_favorites"
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
-    favorite_id: Mapped[int] = mapped_column(ForeignKey("favorites.id"), primary_key=True)
+    favorite_id: Mapped[int] = mapped_column(ForeignKey("favorites.id"), primary_key=True, index=True)
 
 
 class User(SQLAlchemyBaseUserTable[int], Base):
@@ -112,7 +218,7 @@ class User(SQLAlchemyBaseUserTable[int], Base):
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     registered_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(UTC))
-    tg_chat_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    tg_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
 
     favorites: Mapped[list["Favorite"]] = relationship(
         secondary="users_favorites", back_populates="users", lazy="joined", cascade="all, delete"
@@ -1,3 +1,3 @@
 #!/bin/sh
 
-celery -A worker.worker worker -l INFO
+celery -A worker.worker worker -P threads -l INFO
@@ -28,6 +28,15 @@ if config.config_file_name is not None:
 from database.models import *
 
 target_metadata = Base.metadata
+
+PARTITIONED_TABLES = ("publication_prices",)
+
+
+def include_name(name, type_, parent_names):
+    """Skip partitions of partitioned tables, they are created by the maintenance task of the worker."""
+    if type_ == "table":
+        return not name.startswith(tuple(f"{table}_" for table in PARTITIONED_TABLES))
+    return True
 # target_metadata = None
 
 # other values from the config, defined by the needs of env.py,
@@ -52,6 +61,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -74,7 +84,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
 
         with context.begin_transaction():
             context.run_migrations()
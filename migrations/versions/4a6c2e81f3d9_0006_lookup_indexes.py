@@ -0,0 +1,34 @@
+"""0006_lookup_indexes
+
+Revision ID: 4a6c2e81f3d9
+Revises: d7a41c9e0b52
+Create Date: 2026-10-18 15:22:37.904153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a6c2e81f3d9'
+down_revision: Union[str, None] = 'd7a41c9e0b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_publications_active_id', 'publications', ['id'], unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_publication_prices_publication_id_price_date', 'publication_prices', ['publication_id', 'price_date'], unique=False)
+    op.create_index(op.f('ix_publication_images_publication_id'), 'publication_images', ['publication_id'], unique=False)
+    op.create_index(op.f('ix_favorites_publication_id'), 'favorites', ['publication_id'], unique=False)
+    op.create_index(op.f('ix_users_favorites_favorite_id'), 'users_favorites', ['favorite_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_favorites_favorite_id'), table_name='users_favorites')
+    op.drop_index(op.f('ix_favorites_publication_id'), table_name='favorites')
+    op.drop_index(op.f('ix_publication_images_publication_id'), table_name='publication_images')
+    op.drop_index('ix_publication_prices_publication_id_price_date', table_name='publication_prices')
+    op.drop_index('ix_publications_active_id', table_name='publications', postgresql_where=sa.text('is_active'))
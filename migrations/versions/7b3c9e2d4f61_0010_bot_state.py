@@ -0,0 +1,38 @@
+"""0010_bot_state
+
+Revision ID: 7b3c9e2d4f61
+Revises: e6f07b3a9d14
+Create Date: 2026-10-18 21:14:03.582917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3c9e2d4f61'
+down_revision: Union[str, None] = 'e6f07b3a9d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bot_state',
+    sa.Column('key', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.alter_column('users', 'tg_chat_id',
+               existing_type=sa.Integer(),
+               type_=sa.BigInteger(),
+               existing_nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('users', 'tg_chat_id',
+               existing_type=sa.BigInteger(),
+               type_=sa.Integer(),
+               existing_nullable=True)
+    op.drop_table('bot_state')
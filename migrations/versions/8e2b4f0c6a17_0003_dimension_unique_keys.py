@@ -0,0 +1,56 @@
+"""0003_dimension_unique_keys
+
+Revision ID: 8e2b4f0c6a17
+Revises: 3c1d7a52e8b4
+Create Date: 2026-10-18 12:03:18.640951
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2b4f0c6a17'
+down_revision: Union[str, None] = '3c1d7a52e8b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge duplicates inserted by concurrent runs before adding the constraints.
+    op.execute(
+        """
+        WITH duplicates AS (
+            SELECT id, min(id) OVER (PARTITION BY brand, model, generation) AS keep_id FROM car_models
+        )
+        UPDATE publications SET car_model_id = duplicates.keep_id
+        FROM duplicates
+        WHERE publications.car_model_id = duplicates.id AND duplicates.id <> duplicates.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM car_models
+        WHERE id NOT IN (SELECT min(id) FROM car_models GROUP BY brand, model, generation)
+        """
+    )
+    op.execute(
+        """
+        WITH duplicates AS (
+            SELECT id, min(id) OVER (PARTITION BY name) AS keep_id FROM sites
+        )
+        UPDATE publications SET site_id = duplicates.keep_id
+        FROM duplicates
+        WHERE publications.site_id = duplicates.id AND duplicates.id <> duplicates.keep_id
+        """
+    )
+    op.execute("DELETE FROM sites WHERE id NOT IN (SELECT min(id) FROM sites GROUP BY name)")
+    op.create_unique_constraint('uq_car_models_brand_model_generation', 'car_models', ['brand', 'model', 'generation'])
+    op.create_unique_constraint('sites_name_key', 'sites', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('sites_name_key', 'sites', type_='unique')
+    op.drop_constraint('uq_car_models_brand_model_generation', 'car_models', type_='unique')
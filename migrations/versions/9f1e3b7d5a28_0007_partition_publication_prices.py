@@ -0,0 +1,84 @@
+"""0007_partition_publication_prices
+
+Revision ID: 9f1e3b7d5a28
+Revises: 4a6c2e81f3d9
+Create Date: 2026-10-18 16:48:13.571902
+
+"""
+from datetime import date, datetime, UTC
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f1e3b7d5a28'
+down_revision: Union[str, None] = '4a6c2e81f3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.execute('ALTER TABLE publication_prices RENAME TO publication_prices_old')
+    op.execute('ALTER TABLE publication_prices_old RENAME CONSTRAINT publication_prices_pkey TO publication_prices_old_pkey')
+    op.drop_index('ix_publication_prices_publication_id_price_date', table_name='publication_prices_old')
+    op.create_table('publication_prices',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('publication_prices_id_seq'::regclass)"), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('price_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['publication_id'], ['publications.id'], name='publication_prices_publication_id_fkey'),
+    sa.PrimaryKeyConstraint('id', 'price_date'),
+    postgresql_partition_by='RANGE (price_date)'
+    )
+    op.create_index('ix_publication_prices_publication_id_price_date', 'publication_prices', ['publication_id', 'price_date'], unique=False)
+    op.execute('CREATE TABLE publication_prices_default PARTITION OF publication_prices DEFAULT')
+
+    now = datetime.now(UTC)
+    first_date = op.get_bind().execute(sa.text('SELECT min(price_date) FROM publication_prices_old')).scalar() or now
+    month = date(first_date.year, first_date.month, 1)
+    last_month = date(now.year, now.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last_month = next_month(last_month)
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE publication_prices_y{month.year}m{month.month:02d} PARTITION OF publication_prices "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{next_month(month).isoformat()} 00:00+00')"
+        )
+        month = next_month(month)
+
+    op.execute(
+        'INSERT INTO publication_prices (id, price, price_date, publication_id) '
+        'SELECT id, price, price_date, publication_id FROM publication_prices_old'
+    )
+    op.execute('ALTER SEQUENCE publication_prices_id_seq OWNED BY publication_prices.id')
+    op.drop_table('publication_prices_old')
+
+
+def downgrade() -> None:
+    op.execute('ALTER SEQUENCE publication_prices_id_seq OWNED BY NONE')
+    op.execute('ALTER TABLE publication_prices RENAME TO publication_prices_partitioned')
+    op.execute('ALTER TABLE publication_prices_partitioned RENAME CONSTRAINT publication_prices_pkey TO publication_prices_partitioned_pkey')
+    op.drop_index('ix_publication_prices_publication_id_price_date', table_name='publication_prices_partitioned')
+    op.create_table('publication_prices',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('publication_prices_id_seq'::regclass)"), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('price_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['publication_id'], ['publications.id'], name='publication_prices_publication_id_fkey'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        'INSERT INTO publication_prices (id, price, price_date, publication_id) '
+        'SELECT id, price, price_date, publication_id FROM publication_prices_partitioned'
+    )
+    op.execute('DROP TABLE publication_prices_partitioned CASCADE')
+    op.execute('ALTER SEQUENCE publication_prices_id_seq OWNED BY publication_prices.id')
+    op.create_index('ix_publication_prices_publication_id_price_date', 'publication_prices', ['publication_id', 'price_date'], unique=False)
@@ -0,0 +1,40 @@
+"""0004_publication_current_price
+
+Revision ID: b5f93d1e2c40
+Revises: 8e2b4f0c6a17
+Create Date: 2026-10-18 12:41:09.227615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f93d1e2c40'
+down_revision: Union[str, None] = '8e2b4f0c6a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('publications', sa.Column('current_price', sa.Integer(), nullable=True))
+    op.add_column('publications', sa.Column('current_price_date', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        """
+        UPDATE publications
+        SET current_price = latest.price, current_price_date = latest.price_date
+        FROM (
+            SELECT DISTINCT ON (publication_id) publication_id, price, price_date
+            FROM publication_prices
+            ORDER BY publication_id, price_date DESC
+        ) AS latest
+        WHERE publications.id = latest.publication_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('publications', 'current_price_date')
+    op.drop_column('publications', 'current_price')
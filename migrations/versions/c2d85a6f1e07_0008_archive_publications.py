@@ -0,0 +1,74 @@
+"""0008_archive_publications
+
+Revision ID: c2d85a6f1e07
+Revises: 9f1e3b7d5a28
+Create Date: 2026-10-18 18:05:44.610283
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d85a6f1e07'
+down_revision: Union[str, None] = '9f1e3b7d5a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('publications', sa.Column('deactivated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute('UPDATE publications SET deactivated_at = now() WHERE NOT is_active')
+    op.create_table('archived_publications',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.Column('publication_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('link', sa.String(length=75), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('engine_type', sa.String(length=50), nullable=False),
+    sa.Column('engine_hp', sa.String(length=10), nullable=False),
+    sa.Column('engine_volume', sa.String(length=10), nullable=True),
+    sa.Column('transmission_type', sa.String(length=10), nullable=False),
+    sa.Column('car_drive', sa.String(length=20), nullable=False),
+    sa.Column('mileage', sa.String(length=10), nullable=False),
+    sa.Column('car_year', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('current_price', sa.Integer(), nullable=True),
+    sa.Column('current_price_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('content_hash', sa.String(length=32), nullable=True),
+    sa.Column('deactivated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('car_model_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['car_model_id'], ['car_models.id'], ),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('archived_publication_images',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['publication_id'], ['archived_publications.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_publication_images_publication_id'), 'archived_publication_images', ['publication_id'], unique=False)
+    op.create_table('archived_publication_prices',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('price_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['publication_id'], ['archived_publications.id'], ),
+    sa.PrimaryKeyConstraint('id', 'price_date')
+    )
+    op.create_index(op.f('ix_archived_publication_prices_publication_id'), 'archived_publication_prices', ['publication_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archived_publication_prices_publication_id'), table_name='archived_publication_prices')
+    op.drop_table('archived_publication_prices')
+    op.drop_index(op.f('ix_archived_publication_images_publication_id'), table_name='archived_publication_images')
+    op.drop_table('archived_publication_images')
+    op.drop_table('archived_publications')
+    op.drop_column('publications', 'deactivated_at')
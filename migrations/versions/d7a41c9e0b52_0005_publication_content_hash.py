@@ -0,0 +1,26 @@
+"""0005_publication_content_hash
+
+Revision ID: d7a41c9e0b52
+Revises: b5f93d1e2c40
+Create Date: 2026-10-18 14:07:52.318466
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a41c9e0b52'
+down_revision: Union[str, None] = 'b5f93d1e2c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('publications', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('publications', 'content_hash')
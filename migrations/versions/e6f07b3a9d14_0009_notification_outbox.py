@@ -0,0 +1,44 @@
+"""0009_notification_outbox
+
+Revision ID: e6f07b3a9d14
+Revises: c2d85a6f1e07
+Create Date: 2026-10-18 19:32:26.148730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f07b3a9d14'
+down_revision: Union[str, None] = 'c2d85a6f1e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('price_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', sa.String(length=10), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sent_chat_ids', postgresql.ARRAY(sa.BigInteger()), server_default='{}', nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('publication_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['publication_id'], ['publications.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_notification_outbox_pending', 'notification_outbox', ['next_attempt_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_outbox_pending', table_name='notification_outbox', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_table('notification_outbox')
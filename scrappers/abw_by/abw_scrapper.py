@@ -1,24 +1,31 @@
-import re
+import asyncio
+import logging
 import json
-from datetime import timedelta, UTC, datetime
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from typing import AsyncIterator, Iterable
 
-from random import choice, randint
+from random import choice
 
-from requests import get
-from requests.exceptions import ConnectionError
-from time import sleep
+from config import CRAWL_STOP_PAGES, PARSER_WORKERS, PARSER_BATCH_PAGES
+from scrappers.data_classes import Publication, CarModel, PublicationOtherData, PublicationTitleData, CrawlCursor
+from scrappers.base import BaseParser, register
+from scrappers.abw_by.dates import DateParser
+from scrappers.abw_by.extractor import extract_other_data
+from scrappers.http_client import HttpClient, FetchError
+from scrappers.streams import chunked
 
-import locale
+logger = logging.getLogger(__name__)
 
-from scrappers.data_classes import Publication, CarModel, PublicationOtherData, PublicationTitleData
 
-locale.setlocale(locale.LC_ALL, "")
-
-
-class AbwParser:
+@register
+class AbwParser(BaseParser):
+    SITE_NAME = "abw.by"
     SITE_URL = "https://abw.by"
     SITE_API_URL = "https://b.abw.by/api/v2/adverts/list/cars"
-    publications: list = []
     user_agents: list = [
         "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:45.0) Gecko/20100101 Firefox/45.0",
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.105 YaBrowser/21.3.3.230 Yowser/2.5 Safari/537.36",
@@ -39,6 +46,10 @@ class AbwParser:
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.152 YaBrowser/21.2.2.101 Yowser/2.5 Safari/537.36",
     ]
 
+    def __init__(self, share: int = 1) -> None:
+        super().__init__(share)
+        self.date_parser = DateParser()
+
     def get_headers(self) -> dict:
         """
         Select one user agent for headers.
@@ -53,7 +64,7 @@ class AbwParser:
         """
         return {"User-agent": choice(self.user_agents)}
 
-    def get_pages_list(self) -> int:
+    async def get_pages_list(self, client: HttpClient) -> int:
         """
         Retrieve the total number of pages from the API.
 
@@ -61,53 +72,175 @@ class AbwParser:
         response to extract the total number of pages available for
         navigation.
 
+        :param client: HTTP client used to send the request.
         :return: An integer representing the total number of pages.
         """
-        response = get(self.SITE_API_URL)
-        pages = response.json()["pagination"]["pages"]
+        data = await client.get_json(self.SITE_API_URL, headers=self.get_headers())
+        pages = data["pagination"]["pages"]
         return pages
 
-    def get_page_data(self, page: int) -> json:
+    async def get_page_data(self, client: HttpClient, page: int) -> json:
         """
         Get data for a specific page from the API.
 
         This method sends a GET request to the API with the specified
-        page number. If the request is successful, it returns the JSON
-        data for that page.
+        page number. Failed requests are retried by the client; if the
+        page still cannot be retrieved, or the response has no list of
+        adverts, the failure is logged and the page number is recorded
+        in ``failed_pages``, so the page is not mistaken for an empty one.
 
+        :param client: HTTP client used to send the request.
         :param page: An integer representing the page number to retrieve.
         :return: A JSON object containing the data for the specified page
                  if the request is successful; otherwise, None.
         """
-        response = get(self.SITE_API_URL, params={"page": page}, headers=self.get_headers())
-        if response.status_code == 200:
-            return response.json()
+        try:
+            data = await client.get_json(self.SITE_API_URL, params={"page": page}, headers=self.get_headers())
+        except FetchError as e:
+            error = str(e)
+        else:
+            if isinstance(data, dict) and isinstance(data.get("list"), list):
+                return data
+            error = "no list of adverts in the response"
+        logger.warning("Page %s of %s was skipped: %s", page, self.SITE_URL, error)
+        self.failed_pages.append(page)
+        return None
+
+    async def fetch_pages(
+        self, client: HttpClient, pages: Iterable[int], concurrency: int | None = None
+    ) -> AsyncIterator[tuple[int, json]]:
+        """
+        Fetch several pages concurrently.
+
+        Pages are pulled by a fixed number of worker coroutines, so no more
+        than ``concurrency`` requests are in flight at any moment, while the
+        client keeps the request rate within the host limit. Results
+        are yielded as soon as they are ready, which means they are not
+        necessarily in page order. Every worker reports its end to the
+        consumer, and an unexpected error of a worker is re-raised in
+        the consumer instead of leaving it waiting.
+
+        :param client: HTTP client shared by all workers.
+        :param pages: Page numbers to retrieve.
+        :param concurrency: Maximum number of simultaneous requests, CONCURRENCY by default.
+        :return: An async iterator of ``(page, data)`` tuples, where data is
+                 None if the page could not be retrieved.
+        """
+        concurrency = concurrency or self.concurrency
+        pending: asyncio.Queue = asyncio.Queue()
+        for page in pages:
+            pending.put_nowait(page)
+        results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+        async def worker() -> None:
+            outcome = None
+            try:
+                while True:
+                    try:
+                        page = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    data = await self.get_page_data(client, page)
+                    await results.put((page, data))
+            except Exception as e:
+                outcome = e
+            finally:
+                if not asyncio.current_task().cancelling():
+                    await results.put(outcome)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+        try:
+            running = len(workers)
+            while running:
+                result = await results.get()
+                if isinstance(result, Exception):
+                    raise result
+                if result is None:
+                    running -= 1
+                    continue
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def fetch_new_pages(
+        self,
+        client: HttpClient,
+        pages: int,
+        cursor: CrawlCursor,
+        stop_after: int = CRAWL_STOP_PAGES,
+        concurrency: int | None = None,
+    ) -> AsyncIterator[tuple[int, json]]:
+        """
+        Fetch pages until the crawl reaches already known publications.
+
+        Pages are fetched concurrently in windows of ``concurrency`` pages
+        and yielded in page order. Since the site lists the most recently
+        published adverts first, the crawl stops once ``stop_after``
+        consecutive pages contain only publications from the cursor
+        with unchanged prices.
+
+        :param client: HTTP client used to fetch the pages.
+        :param pages: Total number of pages on the site.
+        :param cursor: Publications saved by the previous runs.
+        :param stop_after: Number of consecutive known pages after which the crawl stops.
+        :param concurrency: Maximum number of simultaneous requests, CONCURRENCY by default.
+        :return: An async iterator of ``(page, data)`` tuples.
+        """
+        concurrency = concurrency or self.concurrency
+        known_pages = 0
+        for start in range(1, pages + 1, concurrency):
+            window = range(start, min(start + concurrency, pages + 1))
+            results = dict([result async for result in self.fetch_pages(client, window, concurrency)])
+            for page in window:
+                data = results[page]
+                yield page, data
+                if data is not None and self.is_page_known(data, cursor):
+                    known_pages += 1
+                else:
+                    known_pages = 0
+                if known_pages >= stop_after:
+                    print(f"STOP PARSING ABW.BY AT PAGE {page}: NO NEW PUBLICATIONS")
+                    return
+
+    def is_page_known(self, data: json, cursor: CrawlCursor) -> bool:
+        """
+        Check whether a page contains only known publications.
+
+        :param data: A JSON object returned by the API for one page.
+        :param cursor: Publications saved by the previous runs.
+        :return: True if every advert on the page is in the cursor with the same price.
+        """
+        return all(
+            cursor.is_known(item["id"], self.parse_price(item))
+            for item in data["list"]
+            if isinstance(item["id"], int)
+        )
 
     @staticmethod
-    def get_publication_date(string: str) -> datetime:
+    def parse_price(item: dict) -> int:
+        """
+        Extract the price in USD from an advert.
+
+        :param item: A dictionary describing a single advert.
+        :return: The price as an integer.
+        """
+        return int(item["price"]["usd"][:-4].replace(" ", ""))
+
+    def get_publication_date(self, string: str) -> datetime:
         """
         Convert a publication date string into a datetime object.
 
-        This method takes a string representation of a date and attempts
-        to parse it into a datetime object. It supports various formats,
-        including "вчера" (yesterday). If the format is unrecognized,
-        it defaults to the current date.
+        This method parses the date with the DateParser of the current
+        crawl. It supports various formats, including "вчера"
+        (yesterday). If the format is unrecognized, it defaults to the
+        current date.
 
         :param string: A string representing the publication date.
         :return: A datetime object representing the parsed date.
         """
-        month_now: int = datetime.now(UTC).strftime("%B")
-        year_now: int = datetime.now(UTC).strftime("%Y")
-        try:
-            date = datetime.strptime(string, "%d %B %Y")
-        except ValueError:
-            if string.split(" ")[0] == "вчера":
-                day_now = (datetime.now(UTC) - timedelta(days=1)).strftime("%d")
-                month_now: int = (datetime.now(UTC) - timedelta(days=1)).strftime("%B")
-            else:
-                day_now = datetime.now(UTC).strftime("%d")
-            date = datetime.strptime(f"{day_now} {month_now} {year_now}", "%d %B %Y")
-        return date
+        return self.date_parser.parse(string)
 
     @staticmethod
     def parse_publication_title_data(title: str) -> PublicationTitleData:
@@ -139,152 +272,197 @@ class AbwParser:
         This method extracts various attributes related to the vehicle
         from a given string, including engine type, horsepower,
         engine volume, transmission type, drive type, mileage, and
-        body type. It uses regular expressions to find these attributes
-        in the input string.
+        body type. The string is scanned once by extract_other_data.
 
         :param other_data: A string containing additional information
                            about the vehicle.
         :return: An instance of PublicationOtherData containing the
                  extracted attributes.
         """
-        engine_type = ""
-        engine_hp = ""
-        engine_volume = ""
-        transmission_type = ""
-        drive = ""
-        mileage = ""
-        body_type = ""
-
-        if mileage_match := re.search(r"(\d+(\s\d+)?)\s*км", other_data):
-            mileage = mileage_match.group(1)
-
-        if engine_volume_match := re.search(r"(\d+(\.\d+)?)\s*л", other_data):
-            engine_volume = engine_volume_match.group(1)
-
-        if engine_hp_match := re.search(r"(\d+)\s*л\.с\.", other_data):
-            engine_hp = engine_hp_match.group(1)
-
-        if engine_type_match := re.search(r"(?<=\s)(бензин|дизель|электро|газ|гибрид|гидроген)(?=\s)", other_data):
-            engine_type = engine_type_match.group(0)
-
-        if transmission_type_match := re.search(r"(?<=\s)(автомат|механика|робот|вариатор)(?=\s)", other_data):
-            transmission_type = transmission_type_match.group(0)
-
-        if drive_match := re.search(r"(?<=\s)(полный|передний|задний)(?=\s)", other_data):
-            drive = drive_match.group(0)
-
-        pattern = re.compile(
-            r"""
-            (?<=\s)
-            (внедорожник|кабриолет|купе|лимузин|
-             лифтбек|микроавтобус/бус|минивен|пикап|
-             универсал|седан|фургон|хэтчбек)
-            (?=\s)
-        """,
-            re.VERBOSE,
+        return extract_other_data(other_data)
+
+    def parse_item(self, item: dict) -> Publication | None:
+        """
+        Convert one item of the API response into a Publication.
+
+        :param item: A dictionary describing a single advert.
+        :return: An instance of Publication, or None if the item is not
+                 an advert (e.g. an advertising banner in the list).
+        """
+        if not isinstance(item["id"], int):
+            return None
+        publication_id = item["id"]
+        publication_images = item["images"]
+        publication_price = self.parse_price(item)
+        publication_link = f'{self.SITE_URL}{item["link"]}'
+        publication_description = item["text"]
+        publication_date = self.get_publication_date(item["date"])
+        title_data = self.parse_publication_title_data(item["title"])
+        other_data = self.parse_publication_other_data(item["description"])
+
+        car = CarModel(
+            brand=title_data.car_brand,
+            model=title_data.car_model,
+            generation=title_data.car_model_generation,
         )
-        if body_type_match := re.search(pattern, other_data):
-            body_type = body_type_match.group(0)
 
-        pub_other_data = PublicationOtherData(
-            engine_type, engine_hp, engine_volume, transmission_type, drive, mileage, body_type
+        publication = Publication(
+            id=publication_id,
+            publication_date=publication_date,
+            link=publication_link,
+            images=publication_images,
+            description=publication_description,
+            engine_type=other_data.engine_type,
+            engine_hp=other_data.engine_hp,
+            engine_volume=other_data.engine_volume,
+            transmission_type=other_data.transmission_type,
+            car_drive=other_data.drive,
+            mileage=other_data.mileage,
+            car_year=title_data.car_year,
+            car_body_type=other_data.body_type,
+            price=publication_price,
+            car_model=car,
+            site_name=self.SITE_NAME,
+            site_url=self.SITE_URL,
         )
-        return pub_other_data
+        return publication
 
-    def get_publications_data(self, pages: int) -> None:
+    def parse_page(self, data: json) -> list[Publication]:
         """
-        Retrieve and process publication data from multiple pages.
+        Parse all adverts of one page of the API response.
 
-        This method iterates through the specified number of pages,
-        retrieves publication data from each page, and processes each
-        publication item. It extracts relevant information and saves
-        it as instances of the Publication class.
+        :param data: A JSON object returned by the API for one page.
+        :return: A list of Publication instances found on the page.
+        """
+        publications = []
+        for item in data["list"]:
+            publication = self.parse_item(item)
+            if publication is not None:
+                publications.append(publication)
+        return publications
+
+    async def parse_pages(
+        self, pages_data: AsyncIterator[tuple[int, json]], workers: int = PARSER_WORKERS
+    ) -> AsyncIterator[list[Publication]]:
+        """
+        Parse fetched pages, optionally in a pool of worker processes.
+
+        Without workers every page is parsed inline, in the event loop
+        thread. With workers, pages are grouped into batches of
+        PARSER_BATCH_PAGES and parsed in a ProcessPoolExecutor, keeping
+        up to ``workers`` batches in flight while the following pages are
+        being fetched. The worker processes are spawned rather than
+        forked, because the crawl runs in a multi-threaded Celery worker
+        and a forked child could inherit locks held by other threads.
+
+        :param pages_data: An async iterator of ``(page, data)`` tuples.
+        :param workers: Number of worker processes, 0 to parse inline.
+        :return: An async iterator of lists of parsed publications.
+        """
+        if not workers:
+            async for _, data in pages_data:
+                if data is not None:
+                    yield self.parse_page(data)
+            return
+
+        loop = asyncio.get_running_loop()
+        in_flight: deque[asyncio.Future] = deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            batches = chunked((data async for _, data in pages_data if data is not None), PARSER_BATCH_PAGES)
+            async for batch in batches:
+                in_flight.append(loop.run_in_executor(pool, parse_pages_batch, batch, self.date_parser))
+                if len(in_flight) >= workers:
+                    yield await in_flight.popleft()
+            while in_flight:
+                yield await in_flight.popleft()
+
+    async def get_pages_count(self) -> int:
+        """
+        Retrieve the total number of pages with a short-lived client.
 
-        :param pages: An integer representing the total number of pages
-                      to retrieve data from.
+        :return: An integer representing the total number of pages.
         """
-        print("START PARSING ABW.BY")
-        for p in range(1, pages + 1):
-            try:
-                data = self.get_page_data(p)
-            except ConnectionError as e:
-                continue
-            for item in data["list"]:
-                if isinstance(item["id"], int):
-                    publication_id = item["id"]
-                    publication_images = item["images"]
-                    publication_price = int(item["price"]["usd"][:-4].replace(" ", ""))
-                    publication_link = f'{self.SITE_URL}{item["link"]}'
-                    publication_description = item["text"]
-                    publication_date = self.get_publication_date(item["date"])
-                    title_data = self.parse_publication_title_data(item["title"])
-                    other_data = self.parse_publication_other_data(item["description"])
-
-                    car = CarModel(
-                        brand=title_data.car_brand,
-                        model=title_data.car_model,
-                        generation=title_data.car_model_generation,
-                    )
-
-                    publication = Publication(
-                        id=publication_id,
-                        publication_date=publication_date,
-                        link=publication_link,
-                        images=publication_images,
-                        description=publication_description,
-                        engine_type=other_data.engine_type,
-                        engine_hp=other_data.engine_hp,
-                        engine_volume=other_data.engine_volume,
-                        transmission_type=other_data.transmission_type,
-                        car_drive=other_data.drive,
-                        mileage=other_data.mileage,
-                        car_year=title_data.car_year,
-                        car_body_type=other_data.body_type,
-                        price=publication_price,
-                        car_model=car,
-                        site_name="abw.by",
-                        site_url=self.SITE_URL,
-                    )
-                    self.save_publication(publication)
-            sleep(randint(1, 5))
-        print("END PARSING ABW.BY")
+        async with HttpClient(rate=self.rate, max_connections=1) as client:
+            return await self.get_pages_list(client)
 
-    def save_publication(self, pub) -> None:
+    async def iter_publications(
+        self, cursor: CrawlCursor | None = None, workers: int = PARSER_WORKERS, pages: Iterable[int] | None = None
+    ) -> AsyncIterator[Publication]:
         """
-        Save a publication instance to the internal list.
+        Crawl the site and yield publications as soon as they are parsed.
+
+        Only the pages currently being fetched are kept in memory, so the
+        consumer can process publications in chunks while the crawl is
+        still running.
 
-        This method appends a given publication instance to the internal
-        list of publications for later processing or storage.
+        Without a cursor every page is crawled. With a cursor the crawl is
+        incremental: it stops once it reaches known publications, and
+        publications from the cursor whose price has not changed are
+        not yielded. Explicitly given pages are crawled without a cursor.
 
-        :param pub: An instance of the Publication class to be saved.
+        :param cursor: Publications saved by the previous runs, for an incremental crawl.
+        :param workers: Number of processes parsing the pages, 0 to parse inline.
+        :param pages: Page numbers to crawl, all pages by default.
+        :return: An async iterator of Publication instances.
         """
-        self.publications.append(pub)
+        print("START PARSING ABW.BY")
+        self.failed_pages = []
+        self.date_parser = DateParser()
+        async with HttpClient(rate=self.rate, max_connections=self.concurrency) as client:
+            if pages is not None:
+                cursor = None
+                pages_data = self.fetch_pages(client, pages)
+            elif cursor is None:
+                pages_data = self.fetch_pages(client, range(1, await self.get_pages_list(client) + 1))
+            else:
+                pages_data = self.fetch_new_pages(client, await self.get_pages_list(client), cursor)
+            async for publications in self.parse_pages(pages_data, workers):
+                for publication in publications:
+                    if cursor is None or not cursor.is_known(publication.id, publication.price):
+                        yield publication
+        if self.failed_pages:
+            logger.warning("%s pages of %s were not retrieved", len(self.failed_pages), self.SITE_URL)
+        print("END PARSING ABW.BY")
 
-    def save_json(self) -> None:
+    @staticmethod
+    def save_json(publications: list[Publication]) -> None:
         """
-        Save all collected publications to a JSON file.
+        Save publications to a JSON file.
 
-        This method serializes the internal list of publications into JSON
+        This method serializes the given publications into JSON
         format and writes it to a file named "data.json".
 
+        :param publications: A list of Publication instances to save.
         :return: None
         """
         with open("data.json", "w") as file:
-            data = json.dumps(self.publications, indent=4)
+            data = json.dumps([asdict(pub) for pub in publications], indent=4, default=str)
             file.write(data)
 
-    def get_data(self) -> list:
+    async def get_data(self) -> list[Publication]:
         """
         Retrieve publication data and return a list of publications.
 
-        This method calls the get_publications_data method to fetch
-        publication data from the specified number of pages. After
-        retrieving the data, it returns the internal list of
-        publications.
+        This method collects everything yielded by iter_publications,
+        so it is only suitable for small crawls; long-running jobs
+        should consume iter_publications directly.
 
         :return: A list of Publication instances containing the
                  retrieved publication data.
         """
-        pages = self.get_pages_list()
-        self.get_publications_data(pages=pages)
-        return self.publications
+        return [publication async for publication in self.iter_publications()]
+
+
+def parse_pages_batch(pages_data: list[json], date_parser: DateParser) -> list[Publication]:
+    """
+    Parse several pages of the API response.
+
+    Defined at module level so it can be sent to worker processes.
+
+    :param pages_data: JSON objects returned by the API for several pages.
+    :param date_parser: DateParser of the current crawl.
+    :return: A list of Publication instances found on the pages.
+    """
+    parser = AbwParser()
+    parser.date_parser = date_parser
+    return [publication for data in pages_data for publication in parser.parse_page(data)]
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, UTC
+
+MONTHS: dict[str, int] = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+    "январь": 1,
+    "февраль": 2,
+    "март": 3,
+    "апрель": 4,
+    "май": 5,
+    "июнь": 6,
+    "июль": 7,
+    "август": 8,
+    "сентябрь": 9,
+    "октябрь": 10,
+    "ноябрь": 11,
+    "декабрь": 12,
+}
+
+
+class DateParser:
+    """
+    Parser of the publication dates shown by the site.
+
+    Month names are looked up in a built-in table, so the result does
+    not depend on the locale of the process. "Today" and "yesterday"
+    are computed once, when the parser is created, and parsed strings
+    are memoized, since the same dates repeat many times within a crawl.
+    """
+
+    def __init__(self, now: datetime | None = None) -> None:
+        now = now or datetime.now(UTC)
+        self.today = datetime(now.year, now.month, now.day)
+        self.yesterday = self.today - timedelta(days=1)
+        self._cache: dict[str, datetime] = {}
+
+    def parse(self, string: str) -> datetime:
+        """
+        Convert a publication date string into a datetime object.
+
+        Supports dates like "5 сентября 2024" and "вчера 12:30"
+        (yesterday). If the format is unrecognized, the date of today
+        is returned.
+
+        :param string: A string representing the publication date.
+        :return: A datetime object representing the parsed date.
+        """
+        date = self._cache.get(string)
+        if date is None:
+            date = self._cache[string] = self._parse(string)
+        return date
+
+    def _parse(self, string: str) -> datetime:
+        parts = string.split()
+        if len(parts) == 3:
+            day, month, year = parts
+            month_number = MONTHS.get(month.lower())
+            if month_number is not None and day.isdigit() and year.isdigit():
+                try:
+                    return datetime(int(year), month_number, int(day))
+                except ValueError:
+                    pass
+        if parts and parts[0].lower() == "вчера":
+            return self.yesterday
+        return self.today
@@ -0,0 +1,79 @@
+import re
+
+from scrappers.data_classes import PublicationOtherData
+
+VOCABULARY: dict[str, str] = {
+    "бензин": "engine_type",
+    "дизель": "engine_type",
+    "электро": "engine_type",
+    "газ": "engine_type",
+    "гибрид": "engine_type",
+    "гидроген": "engine_type",
+    "автомат": "transmission_type",
+    "механика": "transmission_type",
+    "робот": "transmission_type",
+    "вариатор": "transmission_type",
+    "полный": "drive",
+    "передний": "drive",
+    "задний": "drive",
+    "внедорожник": "body_type",
+    "кабриолет": "body_type",
+    "купе": "body_type",
+    "лимузин": "body_type",
+    "лифтбек": "body_type",
+    "микроавтобус/бус": "body_type",
+    "минивен": "body_type",
+    "пикап": "body_type",
+    "универсал": "body_type",
+    "седан": "body_type",
+    "фургон": "body_type",
+    "хэтчбек": "body_type",
+}
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<number>\d+)(?:(?P<separator>[.\s])(?P<fraction>\d+))?\s*(?P<unit>км|л\.с\.|(?=л))"
+    r"|(?<=\s)(?P<word>" + "|".join(re.escape(word) for word in VOCABULARY) + r")(?=\s)"
+)
+
+FIELDS = ("engine_type", "engine_hp", "engine_volume", "transmission_type", "drive", "mileage", "body_type")
+
+
+def extract_other_data(other_data: str) -> PublicationOtherData:
+    """
+    Extract vehicle attributes from the description of an advert in one pass.
+
+    The description is scanned once with a single precompiled pattern
+    matching numbers with units (mileage, volume, horsepower) and the
+    words of VOCABULARY. For every attribute the first match is kept,
+    which gives the same result as searching for each attribute
+    separately. As before, a horsepower value also counts as engine
+    volume if no volume precedes it.
+
+    :param other_data: A string containing additional information
+                       about the vehicle.
+    :return: An instance of PublicationOtherData containing the
+             extracted attributes.
+    """
+    found = dict.fromkeys(FIELDS, "")
+    missing = len(FIELDS)
+    for match in TOKEN_PATTERN.finditer(other_data):
+        word = match.group("word")
+        if word is not None:
+            values = ((VOCABULARY[word], word),)
+        else:
+            number, separator, fraction = match.group("number", "separator", "fraction")
+            last = fraction or number
+            whole = f"{number}{separator}{fraction}" if separator else number
+            unit = match.group("unit")
+            if unit == "км":
+                values = (("mileage", last if separator == "." else whole),)
+            else:
+                volume = whole if separator == "." else last
+                values = (("engine_hp", last), ("engine_volume", volume)) if unit else (("engine_volume", volume),)
+        for field, value in values:
+            if not found[field]:
+                found[field] = value
+                missing -= 1
+        if not missing:
+            break
+    return PublicationOtherData(**found)
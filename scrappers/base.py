@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterable
+
+from config import PARSER_CONCURRENCY, PARSER_RATE, PARSER_WORKERS
+from scrappers.data_classes import Publication, CrawlCursor
+
+SCRAPPERS: dict[str, type["BaseParser"]] = {}
+
+
+class BaseParser(ABC):
+    """
+    Base class of the site parsers.
+
+    Every site has its own name, which matches ``Site.name`` in the
+    database, and its own limits: the initial number of requests per
+    second and the number of simultaneous requests. When ``share``
+    parsers crawl the same site at once, each of them gets an equal
+    share of the limits, so together they stay within them.
+    """
+
+    SITE_NAME: str
+    SITE_URL: str
+    RATE: float = PARSER_RATE
+    CONCURRENCY: int = PARSER_CONCURRENCY
+
+    def __init__(self, share: int = 1) -> None:
+        self.rate = self.RATE / share
+        self.concurrency = max(1, self.CONCURRENCY // share)
+        self.failed_pages: list[int] = []
+
+    @abstractmethod
+    async def get_pages_count(self) -> int:
+        """
+        Retrieve the total number of pages of the site.
+
+        :return: An integer representing the total number of pages.
+        """
+
+    @abstractmethod
+    def iter_publications(
+        self, cursor: CrawlCursor | None = None, workers: int = PARSER_WORKERS, pages: Iterable[int] | None = None
+    ) -> AsyncIterator[Publication]:
+        """
+        Crawl the site and yield publications as soon as they are parsed.
+
+        Pages that could not be retrieved must be recorded in
+        ``failed_pages``, so that an incomplete crawl does not
+        deactivate publications.
+
+        :param cursor: Publications saved by the previous runs, for an incremental crawl.
+        :param workers: Number of processes parsing the pages, 0 to parse inline.
+        :param pages: Page numbers to crawl, all pages by default.
+        :return: An async iterator of Publication instances.
+        """
+
+
+def register(parser: type[BaseParser]) -> type[BaseParser]:
+    """
+    Class decorator adding a parser to the registry of crawled sites.
+
+    :param parser: Parser class.
+    :return: The same class.
+    """
+    SCRAPPERS[parser.SITE_NAME] = parser
+    return parser
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, UTC
 
 
 @dataclass
@@ -47,3 +47,21 @@ class PublicationTitleData:
     car_model: str
     car_model_generation: str
     car_year: str
+
+
+@dataclass
+class CrawlCursor:
+    site_name: str
+    known_prices: dict[int, int] = field(default_factory=dict)
+
+    def is_known(self, publication_id: int, price: int) -> bool:
+        return self.known_prices.get(publication_id) == price
+
+
+@dataclass
+class UpsertResult:
+    new: dict[int, Publication] = field(default_factory=dict)
+    price_changed: dict[int, Publication] = field(default_factory=dict)
+    content_changed: dict[int, Publication] = field(default_factory=dict)
+    previous_price_dates: dict[int, datetime | None] = field(default_factory=dict)
+    checked_at: datetime = field(default_factory=lambda: datetime.now(UTC))
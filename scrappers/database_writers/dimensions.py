@@ -0,0 +1,155 @@
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Site, CarModel
+from scrappers.data_classes import Publication as PublicationData
+
+PENDING_KEY = "pending_dimensions"
+
+
+class DimensionCache:
+    """
+    In-memory cache of the ids of sites and car models.
+
+    The tables are loaded once per process and stay warm between runs
+    of the worker. Missing values are created in batches with
+    ``INSERT ... ON CONFLICT DO NOTHING``, relying on the unique
+    constraints, so concurrent runs never insert duplicates.
+
+    The shared cache only holds committed ids, because concurrent
+    sessions cannot see rows of an uncommitted transaction. Ids
+    created by a session are kept in the session until ``commit`` merges
+    them into the shared cache, and ``rollback`` discards them.
+    """
+
+    def __init__(self) -> None:
+        self.sites: dict[str, int] = {}
+        self.car_models: dict[tuple[str, str, str], int] = {}
+        self.loaded = False
+
+    def clear(self) -> None:
+        """Forget all cached ids, they will be loaded again on the next use."""
+        self.sites.clear()
+        self.car_models.clear()
+        self.loaded = False
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Load all sites and car models.
+
+        :param session: Database session for executing queries.
+        """
+        sites = await session.execute(select(Site.name, Site.id))
+        self.sites = {name: pk for name, pk in sites.all()}
+        car_models = await session.execute(select(CarModel.brand, CarModel.model, CarModel.generation, CarModel.id))
+        self.car_models = {(brand, model, generation): pk for brand, model, generation, pk in car_models.all()}
+        self.loaded = True
+
+    @staticmethod
+    def get_pending(session: AsyncSession) -> dict[str, dict]:
+        """
+        Return the ids created by the current transaction of a session.
+
+        :param session: Database session.
+        :return: A dictionary with the ``sites`` and ``car_models`` created by the session.
+        """
+        return session.info.setdefault(PENDING_KEY, {"sites": {}, "car_models": {}})
+
+    def commit(self, session: AsyncSession) -> None:
+        """
+        Move the ids created by a session into the shared cache.
+
+        Must be called after the transaction of the session is committed.
+
+        :param session: Database session.
+        """
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending and self.loaded:
+            self.sites.update(pending["sites"])
+            self.car_models.update(pending["car_models"])
+
+    @staticmethod
+    def rollback(session: AsyncSession) -> None:
+        """
+        Forget the ids created by a session.
+
+        Must be called when the transaction, or a savepoint, of the
+        session is rolled back. Ids created by the transaction that are
+        still valid will be selected again on the next use.
+
+        :param session: Database session.
+        """
+        session.info.pop(PENDING_KEY, None)
+
+    async def get_site_ids(self, items: list[PublicationData], session: AsyncSession) -> dict[str, int]:
+        """
+        Return the ids of the sites of the publications, creating missing sites.
+
+        :param items: PublicationData objects.
+        :param session: Database session for executing queries.
+        :return: A dictionary mapping the site name to its id.
+        """
+        if not self.loaded:
+            await self.load(session)
+        pending = self.get_pending(session)["sites"]
+        site_ids = {**self.sites, **pending}
+        missing = {item.site_name: item.site_url for item in items if item.site_name not in site_ids}
+        if missing:
+            await session.execute(
+                insert(Site)
+                .values([{"name": name, "url": url} for name, url in missing.items()])
+                .on_conflict_do_nothing(index_elements=[Site.name])
+            )
+            result = await session.execute(select(Site.name, Site.id).filter(Site.name.in_(list(missing))))
+            created = {name: pk for name, pk in result.all()}
+            pending.update(created)
+            site_ids.update(created)
+        return {item.site_name: site_ids[item.site_name] for item in items}
+
+    async def get_car_model_ids(
+        self, items: list[PublicationData], session: AsyncSession
+    ) -> dict[tuple[str, str, str], int]:
+        """
+        Return the ids of the car models of the publications, creating missing car models.
+
+        :param items: PublicationData objects.
+        :param session: Database session for executing queries.
+        :return: A dictionary mapping (brand, model, generation) to the id of the car model.
+        """
+        if not self.loaded:
+            await self.load(session)
+        pending = self.get_pending(session)["car_models"]
+        keys = {get_car_model_key(item) for item in items}
+        car_model_ids = {key: self.car_models.get(key, pending.get(key)) for key in keys}
+        missing = [key for key, pk in car_model_ids.items() if pk is None]
+        if missing:
+            await session.execute(
+                insert(CarModel)
+                .values(
+                    [{"brand": brand, "model": model, "generation": generation} for brand, model, generation in missing]
+                )
+                .on_conflict_do_nothing(index_elements=[CarModel.brand, CarModel.model, CarModel.generation])
+            )
+            result = await session.execute(
+                select(CarModel.brand, CarModel.model, CarModel.generation, CarModel.id).filter(
+                    tuple_(CarModel.brand, CarModel.model, CarModel.generation).in_(missing)
+                )
+            )
+            created = {(brand, model, generation): pk for brand, model, generation, pk in result.all()}
+            pending.update(created)
+            car_model_ids.update(created)
+        return car_model_ids
+
+
+def get_car_model_key(item: PublicationData) -> tuple[str, str, str]:
+    """
+    Return the natural key of the car model of a publication.
+
+    :param item: PublicationData object.
+    :return: A (brand, model, generation) tuple.
+    """
+    return item.car_model.brand, item.car_model.model, item.car_model.generation
+
+
+dimensions = DimensionCache()
@@ -0,0 +1,278 @@
+from datetime import date, datetime, timedelta, UTC
+
+from sqlalchemy import delete, exists, func, insert, select, text, bindparam, any_, Integer, ColumnElement
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    PRICE_PARTITIONS_AHEAD,
+    PRICE_ROLLUP_DAYS,
+    PRICE_ROLLUP_PERIOD,
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    NOTIFY_RETENTION_DAYS,
+)
+from database.database import scoped_session
+from database.models import (
+    Publication as PublicationModel,
+    PublicationPrice,
+    PublicationImage,
+    Favorite,
+    ArchivedPublication,
+    ArchivedPublicationPrice,
+    ArchivedPublicationImage,
+    NotificationOutbox,
+)
+from scrappers.notifications.dispatcher import SENT, FAILED
+
+PRICES_TABLE = PublicationPrice.__tablename__
+DEFAULT_PARTITION = f"{PRICES_TABLE}_default"
+
+
+async def create_price_partitions(months_ahead: int = PRICE_PARTITIONS_AHEAD) -> list[str]:
+    """
+    Create the monthly partitions of the price history.
+
+    Partitions are created for the coming months, and for every past
+    month found in the default partition: new publications get a price
+    dated with their publication date, which may be long before the
+    oldest partition. When a partition is created for a month that
+    already has prices in the default partition, they are moved into it
+    before it is attached, so the operation never fails on existing
+    data and the default partition does not keep growing.
+
+    :param months_ahead: Number of months after the current one that must have a partition.
+    :return: Names of the created partitions.
+    """
+    print("START CREATING PRICE PARTITIONS")
+    today = datetime.now(UTC).date()
+    month = date(today.year, today.month, 1)
+    months = set()
+    for _ in range(months_ahead + 1):
+        months.add(month)
+        month = get_next_month(month)
+    created = []
+    async with scoped_session() as session:
+        months.update(await get_default_partition_months(session))
+        for month in sorted(months):
+            name = get_partition_name(month)
+            exists = await session.execute(text("SELECT to_regclass(:name)"), {"name": name})
+            if exists.scalar() is None:
+                await create_partition(name, month, get_next_month(month), session)
+                created.append(name)
+        await session.commit()
+    print("END CREATING PRICE PARTITIONS")
+    return created
+
+
+async def get_default_partition_months(session: AsyncSession) -> list[date]:
+    """
+    Return the months of the prices stored in the default partition.
+
+    :param session: Database session for executing queries.
+    :return: First days of the months, in UTC.
+    """
+    result = await session.execute(
+        text(f"SELECT DISTINCT date_trunc('month', price_date AT TIME ZONE 'UTC') FROM {DEFAULT_PARTITION}")
+    )
+    return [month.date() for month in result.scalars().all()]
+
+
+async def create_partition(name: str, start: date, end: date, session: AsyncSession) -> None:
+    """
+    Create a partition of the price history and attach it to the table.
+
+    :param name: Name of the partition.
+    :param start: First day of the range of the partition.
+    :param end: First day after the range of the partition.
+    :param session: Database session for executing queries.
+    """
+    bounds = {
+        "start": datetime(start.year, start.month, start.day, tzinfo=UTC),
+        "end": datetime(end.year, end.month, end.day, tzinfo=UTC),
+    }
+    await session.execute(text(f"CREATE TABLE {name} (LIKE {PRICES_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE price_date >= :start AND price_date < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    await session.execute(
+        text(
+            f"ALTER TABLE {PRICES_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+        )
+    )
+
+
+async def rollup_prices(older_than_days: int = PRICE_ROLLUP_DAYS, period: str = PRICE_ROLLUP_PERIOD) -> int:
+    """
+    Compact the old price history of inactive publications.
+
+    For every inactive publication only the last price of each period
+    (day or week) older than ``older_than_days`` is kept, the other
+    price points are deleted. The prices of active publications are
+    never touched, so price change detection is not affected.
+
+    :param older_than_days: Age of the prices to compact in days, 0 to disable the rollup.
+    :param period: Length of the period keeping one price: "day" or "week".
+    :return: Number of deleted prices.
+    """
+    if not older_than_days:
+        return 0
+    print("START PRICES ROLLUP")
+    before = datetime.now(UTC) - timedelta(days=older_than_days)
+    number = (
+        func.row_number()
+        .over(
+            partition_by=(PublicationPrice.publication_id, func.date_trunc(period, PublicationPrice.price_date)),
+            order_by=(PublicationPrice.price_date.desc(), PublicationPrice.id.desc()),
+        )
+        .label("number")
+    )
+    old_prices = (
+        select(PublicationPrice.id, PublicationPrice.price_date, number)
+        .join(PublicationModel, PublicationModel.id == PublicationPrice.publication_id)
+        .filter(PublicationModel.is_active == False, PublicationPrice.price_date < before)
+        .subquery()
+    )
+    async with scoped_session() as session:
+        result = await session.execute(
+            delete(PublicationPrice)
+            .where(
+                PublicationPrice.id == old_prices.c.id,
+                PublicationPrice.price_date == old_prices.c.price_date,
+                PublicationPrice.price_date < before,
+                old_prices.c.number > 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    print("END PRICES ROLLUP")
+    return result.rowcount
+
+
+async def purge_notifications(older_than_days: int = NOTIFY_RETENTION_DAYS) -> int:
+    """
+    Delete old processed events from the notification outbox.
+
+    Events that were sent or failed for good are kept for
+    ``older_than_days`` days, pending events are never deleted.
+
+    :param older_than_days: Age of the events to delete in days, 0 to keep them forever.
+    :return: Number of deleted events.
+    """
+    if not older_than_days:
+        return 0
+    print("START NOTIFICATIONS PURGE")
+    before = datetime.now(UTC) - timedelta(days=older_than_days)
+    async with scoped_session() as session:
+        result = await session.execute(
+            delete(NotificationOutbox)
+            .where(NotificationOutbox.status.in_([SENT, FAILED]), NotificationOutbox.created_at < before)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    print("END NOTIFICATIONS PURGE")
+    return result.rowcount
+
+
+async def archive_publications(
+    older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Move publications inactive for a long time into the archive tables.
+
+    Publications are moved with their images and prices in batches,
+    each batch in its own transaction. Publications added to favorites
+    are never archived. Rows locked by a running crawl are skipped and
+    will be archived by the next run.
+
+    :param older_than_days: Number of days since the deactivation, 0 to disable the archival.
+    :param batch_size: Number of publications moved in one transaction.
+    :return: Number of archived publications.
+    """
+    if not older_than_days:
+        return 0
+    print("START ARCHIVING PUBLICATIONS")
+    before = datetime.now(UTC) - timedelta(days=older_than_days)
+    archived = 0
+    async with scoped_session() as session:
+        while True:
+            result = await session.execute(
+                select(PublicationModel.id)
+                .filter(
+                    PublicationModel.is_active == False,
+                    PublicationModel.deactivated_at < before,
+                    ~exists().where(Favorite.publication_id == PublicationModel.id),
+                )
+                .order_by(PublicationModel.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            publication_ids = result.scalars().all()
+            if publication_ids:
+                await archive_batch(publication_ids, session)
+                await session.commit()
+                archived += len(publication_ids)
+            if len(publication_ids) < batch_size:
+                break
+    print("END ARCHIVING PUBLICATIONS")
+    return archived
+
+
+async def archive_batch(publication_ids: list[int], session: AsyncSession) -> None:
+    """
+    Copy publications with their children into the archive tables and delete them.
+
+    :param publication_ids: Database ids of the publications.
+    :param session: Database session for executing queries.
+    """
+    tables = (
+        (PublicationModel, ArchivedPublication, PublicationModel.__table__.c.id),
+        (PublicationImage, ArchivedPublicationImage, PublicationImage.__table__.c.publication_id),
+        (PublicationPrice, ArchivedPublicationPrice, PublicationPrice.__table__.c.publication_id),
+    )
+    for model, archive_model, key in tables:
+        columns = [column.name for column in model.__table__.columns]
+        await session.execute(
+            insert(archive_model).from_select(
+                columns,
+                select(*(model.__table__.c[name] for name in columns)).where(key == get_ids_param(publication_ids)),
+            )
+        )
+    for model, _, key in reversed(tables):
+        await session.execute(delete(model.__table__).where(key == get_ids_param(publication_ids)))
+
+
+def get_ids_param(ids: list[int]) -> ColumnElement:
+    """
+    Return a condition value matching any of the ids, sent as a single array parameter.
+
+    :param ids: Ids to match.
+    :return: ``ANY(:ids)`` expression.
+    """
+    return any_(bindparam("ids", value=list(ids), type_=ARRAY(Integer)))
+
+
+def get_partition_name(month: date) -> str:
+    """
+    Return the name of the partition of the price history of a month.
+
+    :param month: First day of the month.
+    :return: Name of the partition, like "publication_prices_y2024m09".
+    """
+    return f"{PRICES_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def get_next_month(month: date) -> date:
+    """
+    Return the first day of the following month.
+
+    :param month: First day of a month.
+    :return: First day of the next month.
+    """
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
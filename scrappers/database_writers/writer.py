@@ -1,208 +1,542 @@
-from datetime import datetime, UTC
-
-from sqlalchemy import select
+import hashlib
+import logging
+from datetime import datetime
+from typing import AsyncIterable, Iterable
+
+from asyncpg import PostgresError
+from sqlalchemy import (
+    select,
+    literal,
+    literal_column,
+    case,
+    update,
+    delete,
+    exists,
+    func,
+    bindparam,
+    values,
+    column,
+    all_,
+    any_,
+    or_,
+    Integer,
+    String,
+    DateTime,
+    Row,
+)
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import scoped_session
-from scrappers.data_classes import Publication as PublicationData
-from database.models import Publication as PublicationModel, PublicationPrice, Site, CarModel, PublicationImage
-from scrappers.notifications.sender import sender
-
-
-async def save_publications(data: PublicationData) -> None:
+from config import (
+    WRITER_CHUNK_SIZE,
+    WRITER_QUEUE_SIZE,
+    WRITER_COPY_THRESHOLD,
+    WRITER_COMMIT_CHUNKS,
+    CRAWL_MIN_SEEN_SHARE,
+)
+from database.database import scoped_session, Base
+from scrappers.data_classes import Publication as PublicationData, CrawlCursor, UpsertResult
+from database.models import (
+    Publication as PublicationModel,
+    PublicationPrice,
+    Site,
+    PublicationImage,
+    NotificationOutbox,
+    Favorite,
+    UsersFavorites,
+    User,
+)
+from scrappers.database_writers.dimensions import dimensions, get_car_model_key
+from scrappers.streams import chunked, prefetch, aenumerate
+
+logger = logging.getLogger(__name__)
+
+
+async def save_publications(
+    data: AsyncIterable[PublicationData] | Iterable[PublicationData],
+    chunk_size: int = WRITER_CHUNK_SIZE,
+    queue_size: int = WRITER_QUEUE_SIZE,
+    commit_every: int = WRITER_COMMIT_CHUNKS,
+) -> set[int]:
     """
     Save publications to the database.
 
-    This function updates the status of existing publications,
-    and saves new publications along with their associated
+    This function consumes publications in chunks, so the whole crawl
+    never has to be kept in memory. Existing publications are updated,
+    and new publications are saved along with their associated
     data (images, prices, etc.) to the database.
 
-    :param data: PublicationData object containing publication details.
+    With a positive ``queue_size`` the chunks are produced in a
+    background task, so the following pages are fetched and parsed
+    while the current chunk is being written. The queue holds at most
+    ``queue_size`` chunks, which stops the crawl when the database
+    falls behind.
+
+    Every chunk is saved in its own savepoint, and the transaction is
+    committed every ``commit_every`` chunks, after which the session
+    is cleared. A chunk that fails is rolled back and logged without
+    losing the other chunks, and memory does not grow with the run.
+
+    :param data: Iterable or async iterable of PublicationData objects.
+    :param chunk_size: Number of publications processed at once.
+    :param queue_size: Number of chunks buffered ahead of the writer, 0 to fetch and write in turn.
+    :param commit_every: Number of chunks saved in one transaction.
+    :return: Set of ids (on the site) of all publications found, including those of failed chunks.
     """
     print("START WRITING IN DATABASE")
+    seen_ids: set[int] = set()
+    chunks = chunked(data, chunk_size)
+    if queue_size:
+        chunks = prefetch(chunks, queue_size)
+    failed_chunks = 0
     async with scoped_session() as session:
-        await update_publications_status(data, session)
-        for item in data:
-            publication = await session.execute(select(PublicationModel).filter_by(publication_id=item.id))
-            publication = publication.unique().scalars().first()
-            if publication is not None:
-                await upgrade_pub_data(publication, item, session)
-                continue
-            site = await get_site(item, session)
-            car_model = await get_car_model(item, session)
-            new_publication = await add_publication(item, site, car_model, session)
-            await save_images(item, new_publication, session)
-            await save_price(new_publication, item, session)
-        await session.commit()
+        try:
+            async for number, chunk in aenumerate(chunks, start=1):
+                seen_ids.update(item.id for item in chunk)
+                try:
+                    async with session.begin_nested():
+                        await save_chunk(chunk, session)
+                except (SQLAlchemyError, PostgresError):
+                    logger.exception("Chunk of %s publications was not saved", len(chunk))
+                    dimensions.rollback(session)
+                    failed_chunks += 1
+                if number % commit_every == 0:
+                    await session.commit()
+                    dimensions.commit(session)
+                    session.expunge_all()
+            await session.commit()
+            dimensions.commit(session)
+        except Exception:
+            dimensions.rollback(session)
+            raise
+    if failed_chunks:
+        logger.warning("%s chunks of publications were not saved", failed_chunks)
     print("END WRITING IN DATABASE")
+    return seen_ids
 
 
-
-async def update_publications_status(current_publications: PublicationData, session: AsyncSession) -> None:
+async def save_chunk(chunk: list[PublicationData], session: AsyncSession) -> UpsertResult:
     """
-    Update the status of existing publications.
+    Save one chunk of publications with a few set-based statements.
 
-    This function marks publications as inactive if they are not
-    present in the current set of publications.
+    Sites and car models are resolved through the dimension cache, the
+    publications are upserted in one statement, and the images and
+    prices of the chunk are inserted in bulk. The images of
+    publications with a changed content are replaced. Notifications
+    about changed prices are queued in the outbox.
 
-    :param current_publications: CurrentPublicationData object containing active publications.
+    :param chunk: List of PublicationData objects.
+    :param session: Database session for executing queries.
+    :return: UpsertResult with the new publications and the publications with a changed price or content.
+    """
+    items = list({(item.site_name, item.id): item for item in chunk}.values())
+    site_ids = await dimensions.get_site_ids(items, session)
+    car_model_ids = await dimensions.get_car_model_ids(items, session)
+    result = await upsert_publications(items, site_ids, car_model_ids, session)
+    await save_images(result.new, session)
+    await replace_images(result.content_changed, session)
+    await save_prices(result, session)
+    await notify_price_changes(result, session)
+    return result
+
+
+async def upsert_publications(
+    items: list[PublicationData], site_ids: dict[str, int], car_model_ids: dict[tuple, int], session: AsyncSession
+) -> UpsertResult:
+    """
+    Insert new publications and update the known ones that changed.
+
+    The price, the content hash and the status of the known
+    publications of the chunk are fetched with a single query, and
+    publications that are active and have the same price and content
+    are not written at all. The remaining rows are sent as one
+    executemany, which SQLAlchemy turns into multi-row INSERT
+    statements with a cached compiled form. The conflict clause
+    updates a row only if it still differs from the scraped data, so
+    unchanged rows produce no new row versions.
+
+    :param items: PublicationData objects with unique ids (on the site).
+    :param site_ids: Ids of the sites by name.
+    :param car_model_ids: Ids of the car models by (brand, model, generation).
     :param session: Database session for executing queries.
+    :return: UpsertResult with the new publications and the publications with a changed price or content.
     """
-    existing_publications = await session.execute(select(PublicationModel))
-    existing_publications = existing_publications.unique().scalars().all()
-    current_ids: set = {pub.id for pub in current_publications}
-    for pub in existing_publications:
-        if pub.id not in current_ids:
-            pub.is_active = False
+    result = UpsertResult()
+    known = await get_known_publications(set(site_ids.values()), [item.id for item in items], session)
+    rows = []
+    items_by_key = {}
+    for item in items:
+        key = (site_ids[item.site_name], item.id)
+        content_hash = get_content_hash(item)
+        state = known.get(key)
+        if (
+            state is not None
+            and state.is_active
+            and state.current_price == item.price
+            and state.content_hash == content_hash
+        ):
+            continue
+        items_by_key[key] = item
+        rows.append(
+            {
+                "publication_id": item.id,
+                "publication_date": item.publication_date,
+                "link": item.link,
+                "description": item.description,
+                "engine_type": item.engine_type,
+                "engine_hp": item.engine_hp,
+                "engine_volume": item.engine_volume,
+                "transmission_type": item.transmission_type,
+                "car_drive": item.car_drive,
+                "mileage": item.mileage,
+                "car_year": item.car_year,
+                "is_active": True,
+                "current_price": item.price,
+                "current_price_date": item.publication_date,
+                "content_hash": content_hash,
+                "site_id": key[0],
+                "car_model_id": car_model_ids[get_car_model_key(item)],
+            }
+        )
+    if not rows:
+        return result
+
+    statement = insert(PublicationModel)
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=[PublicationModel.site_id, PublicationModel.publication_id],
+        set_={
+            "link": excluded.link,
+            "description": excluded.description,
+            "engine_type": excluded.engine_type,
+            "engine_hp": excluded.engine_hp,
+            "engine_volume": excluded.engine_volume,
+            "transmission_type": excluded.transmission_type,
+            "car_drive": excluded.car_drive,
+            "mileage": excluded.mileage,
+            "car_year": excluded.car_year,
+            "car_model_id": excluded.car_model_id,
+            "content_hash": excluded.content_hash,
+            "is_active": True,
+            "deactivated_at": None,
+            "current_price": excluded.current_price,
+            "current_price_date": case(
+                (PublicationModel.current_price.is_distinct_from(excluded.current_price), result.checked_at),
+                else_=PublicationModel.current_price_date,
+            ),
+        },
+        where=or_(
+            PublicationModel.content_hash.is_distinct_from(excluded.content_hash),
+            PublicationModel.current_price.is_distinct_from(excluded.current_price),
+            PublicationModel.is_active == False,
+        ),
+    ).returning(
+        PublicationModel.id,
+        PublicationModel.site_id,
+        PublicationModel.publication_id,
+        literal_column("xmax = 0").label("inserted"),
+    )
+    upserted = await session.execute(statement, rows)
+
+    for pk, site_id, publication_id, inserted in upserted.all():
+        item = items_by_key[(site_id, publication_id)]
+        if inserted:
+            result.new[pk] = item
+            continue
+        state = known.get((site_id, publication_id))
+        if state is None or state.current_price != item.price:
+            result.price_changed[pk] = item
+            result.previous_price_dates[pk] = state.current_price_date if state is not None else None
+        if state is None or state.content_hash != get_content_hash(item):
+            result.content_changed[pk] = item
+    return result
+
+
+async def get_known_publications(
+    site_ids: set[int], publication_ids: list[int], session: AsyncSession
+) -> dict[tuple[int, int], Row]:
+    """
+    Fetch the state of every known publication of a chunk.
 
+    :param site_ids: Ids of the sites of the chunk.
+    :param publication_ids: Ids (on the site) of the publications of the chunk.
+    :param session: Database session for executing queries.
+    :return: A dictionary mapping (site id, id on the site) to a row with the current
+             price and its date, the content hash and the status of the publication.
+    """
+    result = await session.execute(
+        select(
+            PublicationModel.site_id,
+            PublicationModel.publication_id,
+            PublicationModel.current_price,
+            PublicationModel.current_price_date,
+            PublicationModel.content_hash,
+            PublicationModel.is_active,
+        ).filter(
+            PublicationModel.site_id.in_(site_ids),
+            PublicationModel.publication_id
+            == any_(bindparam("publication_ids", publication_ids, type_=ARRAY(Integer))),
+        )
+    )
+    return {(row.site_id, row.publication_id): row for row in result.all()}
 
-async def get_site(item: PublicationData, session: AsyncSession) -> Site:
+
+def get_content_hash(item: PublicationData) -> str:
+    """
+    Compute the fingerprint of the scraped content of a publication.
+
+    The hash covers the stored fields, the car model and the list of
+    images, but not the price, which is tracked by ``current_price``,
+    nor the publication date, which the site shows relative to today.
+
+    :param item: PublicationData object.
+    :return: Hexadecimal MD5 digest of the normalized fields.
+    """
+    values = (
+        item.link,
+        item.description,
+        item.engine_type,
+        item.engine_hp,
+        item.engine_volume,
+        item.transmission_type,
+        item.car_drive,
+        item.mileage,
+        item.car_year,
+        *get_car_model_key(item),
+        *item.images,
+    )
+    content = "\x1f".join("" if value is None else str(value).strip() for value in values)
+    return hashlib.md5(content.encode(), usedforsecurity=False).hexdigest()
+
+
+async def mark_inactive(site_name: str, seen_ids: set[int], min_seen_share: float = CRAWL_MIN_SEEN_SHARE) -> int:
     """
-    Retrieve or create a site based on the provided item.
+    Mark publications of a site missing from a complete crawl as inactive.
+
+    Must only be called after a full crawl has been saved, otherwise
+    publications that simply were not visited would be deactivated.
+    A crawl that found nothing, or much less than the number of active
+    publications, is more likely broken than the site emptied, so
+    nothing is deactivated in this case.
+
+    :param site_name: Name of the crawled site.
+    :param seen_ids: Ids (on the site) of all publications found by the crawl.
+    :param min_seen_share: Minimal share of the active publications the crawl must have found.
+    :return: Number of deactivated publications.
+    """
+    async with scoped_session() as session:
+        active = await count_active_publications(site_name, session)
+        if not seen_ids or len(seen_ids) < active * min_seen_share:
+            logger.warning(
+                "Crawl of %s found %s of %s active publications, nothing is deactivated",
+                site_name,
+                len(seen_ids),
+                active,
+            )
+            return 0
+        deactivated = await update_publications_status(site_name, seen_ids, session)
+        await session.commit()
+    return deactivated
+
 
-    This function checks if a site with the given name exists in
-    the database; if not, it creates a new Site instance.
+async def count_active_publications(site_name: str, session: AsyncSession) -> int:
+    """
+    Count active publications of a site.
 
-    :param item: PublicationData object containing site details.
+    :param site_name: Name of the site.
     :param session: Database session for executing queries.
-    :return: Site instance.
+    :return: Number of active publications.
+    """
+    result = await session.execute(
+        select(func.count())
+        .select_from(PublicationModel)
+        .join(Site, Site.id == PublicationModel.site_id)
+        .filter(Site.name == site_name, PublicationModel.is_active == True)
+    )
+    return result.scalar()
+
+
+async def get_crawl_cursor(site_name: str) -> CrawlCursor:
     """
-    site_name = item.site_name
-    site = await session.execute(select(Site).filter_by(name=site_name))
-    site = site.unique().scalars().first()
-    if not site:
-        site = Site(name=site_name, url=item.site_url)
-        session.add(site)
-    return site
+    Load the state of a site saved by the previous runs.
 
+    The cursor maps the id (on the site) of every active publication
+    to its current price, which is enough for an incremental crawl to
+    recognize listings that did not change.
 
-async def get_car_model(item: PublicationData, session: AsyncSession) -> CarModel:
+    :param site_name: Name of the site.
+    :return: CrawlCursor of the site.
     """
-    Retrieve or create a car model based on the provided item.
+    async with scoped_session() as session:
+        result = await session.execute(
+            select(PublicationModel.publication_id, PublicationModel.current_price)
+            .join(Site, Site.id == PublicationModel.site_id)
+            .filter(Site.name == site_name, PublicationModel.is_active == True)
+        )
+        known_prices = {publication_id: price for publication_id, price in result.all()}
+    return CrawlCursor(site_name=site_name, known_prices=known_prices)
 
-    This function checks if a car model with the specified brand,
-    model, and generation exists in the database; if not, it creates
-    a new CarModel instance.
 
-    :param item: PublicationData object containing car model details.
+async def update_publications_status(site_name: str, current_ids: set[int], session: AsyncSession) -> int:
+    """
+    Update the status of existing publications of a site.
+
+    This function marks publications as inactive if they are not
+    present in the current set of publications and records the time
+    of the deactivation. The ids are sent as a
+    single array parameter and the update is done by one statement,
+    so no publication is loaded into memory.
+
+    :param site_name: Name of the crawled site.
+    :param current_ids: Ids (on the site) of active publications.
     :param session: Database session for executing queries.
-    :return: CarModel instance.
-    """
-    car_brand_name = item.car_model.brand
-    car_model_name = item.car_model.model
-    car_generation_name = item.car_model.generation
-    car_model = await session.execute(
-        select(CarModel).filter_by(
-            brand=car_brand_name,
-            model=car_model_name,
-            generation=car_generation_name,
+    :return: Number of deactivated publications.
+    """
+    site_id = select(Site.id).filter(Site.name == site_name).scalar_subquery()
+    seen_ids = bindparam("seen_ids", value=list(current_ids), type_=ARRAY(Integer))
+    result = await session.execute(
+        update(PublicationModel)
+        .where(
+            PublicationModel.site_id == site_id,
+            PublicationModel.is_active == True,
+            PublicationModel.publication_id != all_(seen_ids),
         )
+        .values(is_active=False, deactivated_at=func.now())
+        .execution_options(synchronize_session=False)
     )
-    car_model = car_model.unique().scalars().first()
-    if not car_model:
-        car_model = CarModel(
-            brand=car_brand_name,
-            model=car_model_name,
-            generation=car_generation_name,
-        )
-        session.add(car_model)
-    return car_model
+    return result.rowcount
+
+
+async def save_images(publications: dict[int, PublicationData], session: AsyncSession) -> None:
+    """
+    Save images of new publications in bulk.
+
+    :param publications: PublicationData objects by database id of the publication.
+    :param session: Database session for executing queries.
+    """
+    rows = [(img, pk) for pk, item in publications.items() for img in item.images]
+    await bulk_insert(PublicationImage, ("url", "publication_id"), rows, session)
 
 
-async def add_publication(
-    item: PublicationData, site: Site, car_model: CarModel, session: AsyncSession
-) -> PublicationModel:
+async def replace_images(publications: dict[int, PublicationData], session: AsyncSession) -> None:
     """
-    Add a new publication to the database.
-    This function creates a new PublicationModel instance and adds
-    it to the database.
+    Replace images of publications with a changed content in bulk.
 
-    :param item: PublicationData object containing publication details.
-    :param site: Site instance associated with the publication.
-    :param car_model: CarModel instance associated with the publication.
+    :param publications: PublicationData objects by database id of the publication.
     :param session: Database session for executing queries.
-    :return: The created PublicationModel instance.
-    """
-    publication = PublicationModel(
-        publication_id=item.id,
-        publication_date=item.publication_date,
-        link=item.link,
-        description=item.description,
-        engine_type=item.engine_type,
-        engine_hp=item.engine_hp,
-        engine_volume=item.engine_volume,
-        transmission_type=item.transmission_type,
-        car_drive=item.car_drive,
-        mileage=item.mileage,
-        car_year=item.car_year,
-        site=site,
-        car_model=car_model,
+    """
+    if not publications:
+        return
+    publication_ids = bindparam("publication_ids", value=list(publications), type_=ARRAY(Integer))
+    await session.execute(
+        delete(PublicationImage)
+        .where(PublicationImage.publication_id == any_(publication_ids))
+        .execution_options(synchronize_session=False)
     )
-    session.add(publication)
-    return publication
+    await save_images(publications, session)
 
 
-async def save_images(item: PublicationData, publication: PublicationModel, session: AsyncSession) -> None:
+async def save_prices(result: UpsertResult, session: AsyncSession) -> None:
     """
-    Save images associated with a publication.
+    Save prices of new publications and publications with a changed price in bulk.
 
-    This function creates and adds PublicationImage instances for
-    each image in the provided item.
+    New publications get the price on their publication date, changed
+    prices are dated now.
 
-    :param item: PublicationData object containing image URLs.
-    :param publication: PublicationModel instance to associate images with.
+    :param result: UpsertResult of the chunk.
     :param session: Database session for executing queries.
     """
-    for img in item.images:
-        image = PublicationImage(url=img, publication=publication)
-        session.add(image)
+    rows = [(item.price, item.publication_date, pk) for pk, item in result.new.items()]
+    rows += [(item.price, result.checked_at, pk) for pk, item in result.price_changed.items()]
+    await bulk_insert(PublicationPrice, ("price", "price_date", "publication_id"), rows, session)
 
 
-async def save_price(publication: PublicationModel, item: PublicationData, session: AsyncSession) -> None:
+async def bulk_insert(model: type[Base], columns: tuple[str, ...], rows: list[tuple], session: AsyncSession) -> None:
     """
-    Save the price associated with a publication.
+    Insert many rows into the table of a model.
 
-    This function creates and adds a PublicationPrice instance
-    based on the provided item's price information.
+    Small batches are inserted with a regular INSERT. Batches of at
+    least WRITER_COPY_THRESHOLD rows, typical for backfills and new
+    sites, are streamed with the COPY protocol of asyncpg, inside the
+    transaction of the session.
 
-    :param publication: PublicationModel instance to associate price with.
-    :param item: PublicationData object containing price details.
+    :param model: Model of the table.
+    :param columns: Names of the inserted columns.
+    :param rows: Values of the columns, in the same order.
     :param session: Database session for executing queries.
     """
-    price = PublicationPrice(
-        price=item.price,
-        price_date=item.publication_date,
-        publication=publication,
+    if not rows:
+        return
+    if len(rows) < WRITER_COPY_THRESHOLD:
+        await session.execute(insert(model), [dict(zip(columns, row)) for row in rows])
+        return
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        model.__tablename__, records=rows, columns=columns
     )
-    session.add(price)
 
 
-async def upgrade_pub_data(publication: PublicationModel, new_data: PublicationData, session: AsyncSession) -> None:
+async def notify_price_changes(result: UpsertResult, session: AsyncSession) -> None:
     """
-    Updates the publication data and adds a new price if it has changed.
+    Queue notifications about publications with a changed price.
 
-    :param publication: The publication model to be updated.
-    :param new_data: New data for updating the publication, including the price.
-    :param session: Asynchronous database session for executing operations.
+    The events are written to the notification outbox in the
+    transaction of the chunk, and are sent later by the dispatcher, so
+    the writer never waits for Telegram. Only publications that somebody
+    with a linked Telegram chat added to favorites get an event, which
+    is selected by a single ``INSERT ... SELECT``.
 
-    :return: None. The function modifies the publication state and adds a new price to the database
-             if the price has changed.
+    The idempotency key is made of the publication, the new price and
+    the date of the previous price, so saving the same change twice,
+    even by another crawl, is harmless.
+
+    :param result: UpsertResult of the chunk.
+    :param session: Database session for executing queries.
     """
-    result = await session.execute(
-        select(PublicationPrice)
-        .filter(PublicationPrice.publication_id == publication.id)
-        .order_by(PublicationPrice.price_date.desc())
-    )
-    exist_price = result.unique().scalars().first()
-    current_price = new_data.price
-    publication.is_active = True
-    session.add(publication)
-    if exist_price.price == current_price:
+    if not result.price_changed:
         return
-    price = PublicationPrice(
-        price=new_data.price,
-        price_date=datetime.now(UTC),
-        publication=publication,
+    changes = values(
+        column("idempotency_key", String),
+        column("publication_id", Integer),
+        column("price", Integer),
+        name="changes",
+    ).data(
+        [
+            (get_idempotency_key(pk, item.price, result.previous_price_dates.get(pk)), pk, item.price)
+            for pk, item in result.price_changed.items()
+        ]
     )
-    session.add(price)
-    await sender(publication, price, session)
+    subscribed = (
+        exists()
+        .where(Favorite.publication_id == changes.c.publication_id)
+        .where(UsersFavorites.favorite_id == Favorite.id)
+        .where(User.id == UsersFavorites.user_id, User.tg_chat_id.is_not(None))
+    )
+    await session.execute(
+        insert(NotificationOutbox)
+        .from_select(
+            ["idempotency_key", "publication_id", "price", "price_date"],
+            select(
+                changes.c.idempotency_key,
+                changes.c.publication_id,
+                changes.c.price,
+                literal(result.checked_at, DateTime(timezone=True)),
+            ).where(subscribed),
+        )
+        .on_conflict_do_nothing(index_elements=[NotificationOutbox.idempotency_key])
+    )
+
+
+def get_idempotency_key(pk: int, price: int, previous_price_date: datetime | None) -> str:
+    """
+    Return the idempotency key of a price change.
+
+    :param pk: Database id of the publication.
+    :param price: New price of the publication.
+    :param previous_price_date: Date of the previous price, None if it is not known.
+    :return: The idempotency key.
+    """
+    previous = previous_price_date.strftime("%Y%m%d%H%M%S%f") if previous_price_date else "none"
+    return f"price:{pk}:{price}:{previous}"
@@ -0,0 +1,169 @@
+import asyncio
+import json
+from random import uniform
+from time import monotonic
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import PARSER_RATE, PARSER_RETRIES, PARSER_CONCURRENCY
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Raised when a request keeps failing after all retries."""
+
+
+class TokenBucket:
+    """
+    Adaptive token bucket limiting the request rate to a single host.
+
+    The rate grows additively after successful responses and is halved
+    when the host answers with 429 or 5xx, so the crawler settles close
+    to the highest rate the site tolerates.
+    """
+
+    def __init__(self, rate: float, min_rate: float = 0.2, max_rate: float | None = None) -> None:
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.max_rate = max_rate or rate * 4
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request to the host is allowed."""
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0 and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(max(wait, (1 - self._tokens) / self.rate))
+
+    def reward(self) -> None:
+        """Slowly increase the rate after a successful response."""
+        self.rate = min(self.max_rate, self.rate + 0.1)
+        self.capacity = max(1.0, self.rate)
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        """
+        Halve the rate after the host signalled overload.
+
+        :param retry_after: Seconds the host asked to wait before the next request, if any.
+        """
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.capacity = max(1.0, self.rate)
+        self._tokens = min(self._tokens, 0)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, monotonic() + retry_after)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the scrappers.
+
+    Wraps a pooled ``httpx.AsyncClient`` so connections are kept alive
+    between requests, limits the request rate per host with an adaptive
+    token bucket and retries failed requests with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        rate: float = PARSER_RATE,
+        retries: int = PARSER_RETRIES,
+        backoff: float = 1.0,
+        max_connections: int = PARSER_CONCURRENCY,
+        timeout: float = 30.0,
+    ) -> None:
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self._buckets: dict[str, TokenBucket] = {}
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self._client.aclose()
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """
+        Return the rate limiter of the host the url points to.
+
+        :param url: Requested url.
+        :return: TokenBucket shared by all requests to the same host.
+        """
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate)
+        return self._buckets[host]
+
+    async def get_json(self, url: str, params: dict | None = None, headers: dict | None = None) -> json:
+        """
+        Send a GET request and decode the JSON body of the response.
+
+        Responses with 429 or 5xx status codes, bodies that are not JSON
+        (like maintenance pages) and network errors are retried with
+        exponential backoff; other error statuses fail immediately.
+
+        :param url: Requested url.
+        :param params: Query string parameters.
+        :param headers: Request headers.
+        :return: Decoded JSON body.
+        :raises FetchError: If the request did not succeed.
+        """
+        bucket = self.get_bucket(url)
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) + uniform(0, self.backoff))
+            await bucket.acquire()
+            try:
+                response = await self._client.get(url, params=params, headers=headers)
+            except httpx.HTTPError as e:
+                error = repr(e)
+                continue
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError as e:
+                    error = f"invalid JSON: {e}"
+                    continue
+                bucket.reward()
+                return data
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+            bucket.penalize(get_retry_after(response))
+        raise FetchError(f"GET {url} {params or ''} failed: {error}")
+
+
+def get_retry_after(response: httpx.Response) -> float | None:
+    """
+    Read the Retry-After header of a response.
+
+    :param response: Response of the host.
+    :return: Number of seconds to wait, or None if the header is absent or is not a number.
+    """
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import select, func, exists, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+
+from config import (
+    NOTIFY_BATCH_SIZE,
+    NOTIFY_CONCURRENCY,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_RETRY_DELAY,
+    NOTIFY_LEASE,
+    NOTIFY_DIGEST,
+    NOTIFY_DIGEST_WINDOW,
+)
+from database.database import scoped_session
+from database.models import NotificationOutbox, Publication, PublicationPrice
+from scrappers.notifications.sender import get_subscribers, create_message, split_message
+from scrappers.notifications.tg.client import TelegramClient
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+async def dispatch_notifications(
+    batch_size: int = NOTIFY_BATCH_SIZE,
+    concurrency: int = NOTIFY_CONCURRENCY,
+    max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+    digest: bool = NOTIFY_DIGEST,
+    window: int = NOTIFY_DIGEST_WINDOW,
+    lease: int = NOTIFY_LEASE,
+) -> int:
+    """
+    Send the pending notifications of the outbox.
+
+    Events are claimed in batches: they are locked with
+    ``FOR UPDATE SKIP LOCKED`` and their next attempt is moved ``lease``
+    seconds ahead in a short transaction, so several dispatchers never
+    send the same event and no lock is held while messages are sent.
+    At most ``concurrency`` messages are sent at once, and the Telegram
+    client keeps the sending rate within the limits of the Bot API.
+    Every chat that received its message is recorded in the events in
+    its own transaction, so if the dispatcher stops, the events are
+    claimed again when the lease ends and only the remaining chats get
+    a message. A failed event is retried later with an exponential
+    delay, and is given up after ``max_attempts`` attempts.
+
+    In digest mode all due events are claimed at once, and every chat
+    gets a single message with all of its events, split at the length
+    limit of Telegram. Sending waits until no event has been added for
+    ``window`` seconds, so the changes found by one run of the parser
+    end up in one digest. The outbox only holds events of publications
+    with subscribers, so the number of due events stays bounded by the
+    changes of one run.
+
+    :param batch_size: Number of events claimed at once, when events are not grouped into digests.
+    :param concurrency: Maximum number of messages sent at once.
+    :param max_attempts: Number of attempts before an event is marked as failed.
+    :param digest: Whether to group the events of a chat into one message.
+    :param window: Seconds without new events before a digest is sent.
+    :param lease: Seconds for which claimed events are reserved for this dispatcher.
+    :return: Number of processed events.
+    """
+    print("START SENDING NOTIFICATIONS")
+    semaphore = asyncio.Semaphore(concurrency)
+    processed = 0
+    async with TelegramClient(max_connections=concurrency) as client:
+        if digest and window:
+            async with scoped_session() as session:
+                recent = await has_recent_events(window, session)
+            if recent:
+                print("END SENDING NOTIFICATIONS")
+                return processed
+        while True:
+            events = await claim_events(None if digest else batch_size, lease)
+            if events:
+                await dispatch_batch(events, client, semaphore, max_attempts, digest)
+                processed += len(events)
+            if digest or len(events) < batch_size:
+                break
+    print("END SENDING NOTIFICATIONS")
+    return processed
+
+
+async def claim_events(limit: int | None, lease: int) -> list[NotificationOutbox]:
+    """
+    Reserve the due events of the outbox for this dispatcher.
+
+    :param limit: Maximum number of events, or None for all due events.
+    :param lease: Seconds for which the events are reserved.
+    :return: The claimed events, detached from the committed transaction.
+    """
+    async with scoped_session() as session:
+        result = await session.execute(
+            select(NotificationOutbox)
+            .filter(NotificationOutbox.status == PENDING, NotificationOutbox.next_attempt_at <= func.now())
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        events = result.scalars().all()
+        leased_until = datetime.now(UTC) + timedelta(seconds=lease)
+        for event in events:
+            event.next_attempt_at = leased_until
+        await session.commit()
+    return events
+
+
+async def has_recent_events(window: int, session: AsyncSession) -> bool:
+    """
+    Check whether pending events were added during the last seconds.
+
+    :param window: Number of seconds.
+    :param session: Database session for executing queries.
+    :return: True if an event was added less than ``window`` seconds ago.
+    """
+    result = await session.execute(
+        select(
+            exists().where(
+                NotificationOutbox.status == PENDING,
+                NotificationOutbox.created_at > func.now() - timedelta(seconds=window),
+            )
+        )
+    )
+    return result.scalar()
+
+
+async def dispatch_batch(
+    events: list[NotificationOutbox],
+    client: TelegramClient,
+    semaphore: asyncio.Semaphore,
+    max_attempts: int,
+    digest: bool,
+) -> None:
+    """
+    Send the messages of a batch of claimed events and record the outcome.
+
+    :param events: Claimed outbox events.
+    :param client: Telegram client sending the messages.
+    :param semaphore: Semaphore limiting the number of messages sent at once.
+    :param max_attempts: Number of attempts before an event is marked as failed.
+    :param digest: Whether to group the events of a chat into one message.
+    """
+    async with scoped_session() as session:
+        result = await session.execute(
+            select(Publication)
+            .filter(Publication.id.in_({event.publication_id for event in events}))
+            .options(noload(Publication.prices), noload(Publication.images))
+        )
+        publications = {publication.id: publication for publication in result.unique().scalars().all()}
+        subscribers = await get_subscribers(list(publications), session)
+    messages: dict[int, str] = {}
+    recipients: dict[int, list[NotificationOutbox]] = defaultdict(list)
+    for event in events:
+        publication = publications[event.publication_id]
+        chat_ids = subscribers.get(event.publication_id, [])
+        price = PublicationPrice(price=event.price, price_date=event.price_date)
+        messages[event.id] = await create_message(publication, price)
+        for chat_id in chat_ids:
+            if chat_id not in event.sent_chat_ids:
+                recipients[chat_id].append(event)
+
+    if digest:
+        deliveries = [
+            (chat_id, chat_events, split_message("\n".join(messages[event.id] for event in chat_events)))
+            for chat_id, chat_events in recipients.items()
+        ]
+    else:
+        deliveries = [
+            (chat_id, [event], [messages[event.id]])
+            for chat_id, chat_events in recipients.items()
+            for event in chat_events
+        ]
+    outcomes = await asyncio.gather(
+        *(deliver(chat_id, chat_events, texts, client, semaphore) for chat_id, chat_events, texts in deliveries),
+        return_exceptions=True,
+    )
+
+    errors: dict[int, list[Exception]] = defaultdict(list)
+    for (chat_id, chat_events, _), error in zip(deliveries, outcomes):
+        if error is not None:
+            for event in chat_events:
+                errors[event.id].append(error)
+    await finish_events([event.id for event in events], errors, max_attempts)
+
+
+async def deliver(
+    chat_id: int,
+    events: list[NotificationOutbox],
+    texts: list[str],
+    client: TelegramClient,
+    semaphore: asyncio.Semaphore,
+) -> None:
+    """
+    Send the messages of events to a chat and record the chat in the events.
+
+    :param chat_id: Telegram chat ID.
+    :param events: Events the messages belong to.
+    :param texts: Texts of the messages.
+    :param client: Telegram client sending the messages.
+    :param semaphore: Semaphore limiting the number of messages sent at once.
+    """
+    await send_messages(chat_id, texts, client, semaphore)
+    async with scoped_session() as session:
+        await session.execute(
+            update(NotificationOutbox)
+            .where(
+                NotificationOutbox.id.in_([event.id for event in events]),
+                ~NotificationOutbox.sent_chat_ids.contains([chat_id]),
+            )
+            .values(sent_chat_ids=func.array_append(NotificationOutbox.sent_chat_ids, chat_id))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def finish_events(ids: list[int], errors: dict[int, list[Exception]], max_attempts: int) -> None:
+    """
+    Record the outcome of sending the claimed events.
+
+    :param ids: IDs of the events.
+    :param errors: Errors of the failed deliveries by event ID.
+    :param max_attempts: Number of attempts before an event is marked as failed.
+    """
+    async with scoped_session() as session:
+        result = await session.execute(
+            select(NotificationOutbox).filter(NotificationOutbox.id.in_(ids)).with_for_update()
+        )
+        now = datetime.now(UTC)
+        for event in result.scalars().all():
+            event_errors = errors[event.id]
+            if not event_errors:
+                event.status = SENT
+                continue
+            event.attempts += 1
+            event.last_error = repr(event_errors[0])
+            if event.attempts >= max_attempts:
+                event.status = FAILED
+                logger.warning(
+                    "Notification %s was not sent to %s chats: %r", event.id, len(event_errors), event_errors[0]
+                )
+            else:
+                event.next_attempt_at = now + timedelta(seconds=NOTIFY_RETRY_DELAY * 2 ** (event.attempts - 1))
+        await session.commit()
+
+
+async def send_messages(chat_id: int, texts: list[str], client: TelegramClient, semaphore: asyncio.Semaphore) -> None:
+    """
+    Send messages to a chat in order.
+
+    :param chat_id: Telegram chat ID.
+    :param texts: Texts of the messages.
+    :param client: Telegram client sending the messages.
+    :param semaphore: Semaphore limiting the number of messages sent at once.
+    """
+    for text in texts:
+        async with semaphore:
+            await client.send_message(chat_id, text)
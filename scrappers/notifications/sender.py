@@ -1,58 +1,36 @@
-import requests
+from collections import defaultdict
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import TG_BOT_TOKEN
-from database.models import PublicationPrice, User, Favorite
+from database.models import PublicationPrice, User, Favorite, UsersFavorites
 from database.models import Publication
+from scrappers.notifications.tg.client import MESSAGE_LENGTH_LIMIT
 
 
-async def sender(publication: Publication, price: PublicationPrice, session: AsyncSession):
+async def get_subscribers(publication_ids: list[int], session: AsyncSession) -> dict[int, list[int]]:
     """
-    Sends a notification about a price change in a publication to users who have favorited it.
+    Retrieves the Telegram chat IDs of the users who have favorited publications.
 
-    :param publication: The publication object containing details about the listing.
-    :param price: The publication price object with the new price information.
-    :param session: Asynchronous database session for executing operations.
-
-    :return: None. The function sends notifications to users.
-    """
-    users = await get_users(publication, session)
-    chat_ids = await get_chat_ids(users)
-    message = await create_message(publication, price)
-    for chat_id in chat_ids:
-        await send_notification(chat_id, message)
-
-
-async def get_users(publication: Publication, session: AsyncSession) -> list[User]:
-    """
-    Retrieves users who have favorited a specific publication.
+    All publications are resolved with one query that selects only the
+    ids, without loading users, favorites or publications.
 
-    :param publication: The publication object to fetch users for.
+    :param publication_ids: IDs of the publications.
     :param session: Asynchronous database session for executing operations.
 
-    :return: A list of User objects who have favorited the publication.
-    """
-    result = await session.execute(select(User).join(Favorite.users).filter(Favorite.publication_id == publication.id))
-    users = result.unique().scalars().all()  # []
-    return users
-
-
-async def get_chat_ids(users: list[User]) -> list:
-    """
-    Extracts Telegram chat IDs from a list of users.
-
-    :param users: A list of User objects to extract chat IDs from.
-
-    :return: A list of Telegram chat IDs associated with the users.
+    :return: A dictionary mapping the ID of a publication to the chat IDs of its subscribers.
     """
-    chat_ids: list = []
-    for user in users:
-        chat_id = user.tg_chat_id
-        if chat_id is not None:
-            chat_ids.append(chat_id)
-    return chat_ids
+    result = await session.execute(
+        select(Favorite.publication_id, User.tg_chat_id)
+        .join(UsersFavorites, UsersFavorites.favorite_id == Favorite.id)
+        .join(User, User.id == UsersFavorites.user_id)
+        .filter(Favorite.publication_id.in_(publication_ids), User.tg_chat_id.is_not(None))
+        .distinct()
+    )
+    subscribers: dict[int, list[int]] = defaultdict(list)
+    for publication_id, chat_id in result.all():
+        subscribers[publication_id].append(chat_id)
+    return dict(subscribers)
 
 
 async def create_message(publication: Publication, price: PublicationPrice) -> str:
@@ -74,14 +52,30 @@ async def create_message(publication: Publication, price: PublicationPrice) -> s
     return message
 
 
-async def send_notification(chat_id: int, message: str):
+def split_message(text: str, limit: int = MESSAGE_LENGTH_LIMIT) -> list[str]:
     """
-    Sends a notification message to a specific Telegram chat.
+    Split a long text into messages that Telegram accepts.
 
-    :param chat_id: The Telegram chat ID to send the message to.
-    :param message: The message content to be sent.
+    The text is split between lines where possible; a single line
+    longer than the limit is cut.
 
-    :return: None. The function performs a network request to send the message.
+    :param text: Text to send.
+    :param limit: Maximum length of a message.
+    :return: A list of texts no longer than ``limit``.
     """
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage?chat_id={chat_id}&text={message}"
-    requests.get(url).json()
+    parts: list[str] = []
+    part = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if part:
+                parts.append(part)
+                part = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        if len(part) + len(line) > limit:
+            parts.append(part)
+            part = ""
+        part += line
+    if part.strip():
+        parts.append(part)
+    return parts
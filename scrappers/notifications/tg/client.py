@@ -0,0 +1,146 @@
+import asyncio
+import json
+from random import uniform
+
+import httpx
+
+from config import TG_BOT_TOKEN, TG_API_URL, TG_RATE, TG_CHAT_RATE, TG_RETRIES
+from scrappers.http_client import TokenBucket
+
+MESSAGE_LENGTH_LIMIT = 4096
+
+
+class TelegramError(Exception):
+    """Raised when the Bot API rejects a request or keeps failing after all retries."""
+
+    def __init__(self, description: str, error_code: int | None = None) -> None:
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+
+
+class TelegramClient:
+    """
+    Asynchronous client of the Telegram Bot API.
+
+    Requests are sent as JSON bodies over a pooled ``httpx.AsyncClient``.
+    The client keeps below the limits of Telegram with a global token
+    bucket for the bot and a token bucket per chat. When Telegram
+    answers with 429, the request is repeated after the ``retry_after``
+    delay it returned, and the rates of the chat and of the bot are
+    halved, so the other chats wait too; network errors and 5xx
+    responses are retried with exponential backoff.
+
+    The base url is configurable, so the client can be pointed at a
+    local Bot API server or a stand-in server.
+    """
+
+    def __init__(
+        self,
+        token: str = TG_BOT_TOKEN,
+        base_url: str = TG_API_URL,
+        rate: float = TG_RATE,
+        chat_rate: float = TG_CHAT_RATE,
+        retries: int = TG_RETRIES,
+        backoff: float = 1.0,
+        max_connections: int = 10,
+        timeout: float = 30.0,
+    ) -> None:
+        self.url = f"{base_url.rstrip('/')}/bot{token}"
+        self.chat_rate = chat_rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, max_rate=rate)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def __aenter__(self) -> "TelegramClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self._client.aclose()
+
+    def get_chat_bucket(self, chat_id: int) -> TokenBucket:
+        """
+        Return the rate limiter of a chat.
+
+        :param chat_id: Telegram chat ID.
+        :return: TokenBucket shared by all requests to the chat.
+        """
+        if chat_id not in self._chat_buckets:
+            self._chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, min_rate=self.chat_rate / 10, max_rate=self.chat_rate
+            )
+        return self._chat_buckets[chat_id]
+
+    async def call(self, method: str, payload: dict, chat_id: int | None = None, timeout: float = 0) -> json:
+        """
+        Call a method of the Bot API.
+
+        :param method: Name of the method, like "sendMessage".
+        :param payload: Parameters of the method, sent as a JSON body.
+        :param chat_id: Chat the request is addressed to, to respect the limit of the chat.
+        :param timeout: Extra seconds to wait for the response, for long polling.
+        :return: Decoded "result" field of the response.
+        :raises TelegramError: If Telegram rejected the request or it did not succeed after all retries.
+        """
+        bucket = self.get_chat_bucket(chat_id) if chat_id is not None else self.bucket
+        error = TelegramError(f"{method} was not sent")
+        for attempt in range(self.retries + 1):
+            if chat_id is not None:
+                await bucket.acquire()
+            await self.bucket.acquire()
+            try:
+                response = await self._client.post(f"{self.url}/{method}", json=payload, timeout=self.timeout + timeout)
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                error = TelegramError(f"{method} failed: {e!r}")
+                await asyncio.sleep(self.backoff * 2**attempt + uniform(0, self.backoff))
+                continue
+            if data.get("ok"):
+                bucket.reward()
+                return data["result"]
+            error = TelegramError(data.get("description", f"HTTP {response.status_code}"), data.get("error_code"))
+            if response.status_code == 429:
+                retry_after = data.get("parameters", {}).get("retry_after")
+                bucket.penalize(retry_after)
+                if bucket is not self.bucket:
+                    self.bucket.penalize(retry_after)
+            elif response.status_code >= 500:
+                await asyncio.sleep(self.backoff * 2**attempt + uniform(0, self.backoff))
+            else:
+                break
+        raise error
+
+    async def send_message(self, chat_id: int, text: str, **options) -> dict:
+        """
+        Send a text message to a chat.
+
+        :param chat_id: Telegram chat ID.
+        :param text: Text of the message.
+        :param options: Other parameters of sendMessage, like ``parse_mode``.
+        :return: The sent message.
+        """
+        return await self.call("sendMessage", {"chat_id": chat_id, "text": text, **options}, chat_id=chat_id)
+
+    async def get_updates(self, offset: int | None = None, timeout: int = 0, limit: int = 100) -> list[dict]:
+        """
+        Receive incoming updates of the bot.
+
+        :param offset: Identifier of the first update to return; earlier updates are confirmed.
+        :param timeout: Seconds to wait for an update (long polling), 0 for short polling.
+        :param limit: Maximum number of updates.
+        :return: List of updates.
+        """
+        payload = {"timeout": timeout, "limit": limit}
+        if offset is not None:
+            payload["offset"] = offset
+        return await self.call("getUpdates", payload, timeout=timeout)
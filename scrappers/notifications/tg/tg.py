@@ -1,54 +1,117 @@
-import requests
-from sqlalchemy import select
+from sqlalchemy import select, update, values, column, Integer, BigInteger
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import TG_BOT_TOKEN
+from config import TG_POLL_TIMEOUT
 from database.database import scoped_session
-from database.models import User
+from database.models import User, BotState
+from scrappers.notifications.tg.client import TelegramClient
 
+UPDATES_OFFSET_KEY = "telegram_updates_offset"
+UPDATES_LIMIT = 100
+MAX_USER_ID = 2**31 - 1
 
-async def update_user_tg_ids() -> None:
+
+async def update_user_tg_ids(timeout: int = TG_POLL_TIMEOUT) -> int:
     """
     Updates the Telegram chat IDs for users in the database.
 
-    Fetches new Telegram chat IDs and associates them with user IDs.
-    If a user ID exists in the database, their corresponding Telegram
-    chat ID is updated.
+    Fetches the updates received since the previous call and associates
+    chat IDs with user IDs. The identifier of the next expected update
+    is saved in the database together with the linked users, so every
+    update is processed once. With a positive ``timeout`` the first
+    request waits for new messages (long polling).
 
-    :return: None. The function modifies user records in the database.
+    :param timeout: Seconds to wait for new updates, 0 to only fetch pending updates.
+    :return: Number of processed updates.
     """
-    async with scoped_session() as session:
-        ids = await get_new_ids()
-        for chat_id, user_id in ids.items():
-            result = await session.execute(select(User).filter(User.id == user_id))
-            user = result.unique().scalars().first()
-            if user is not None:
-                user.tg_chat_id = chat_id
-        await session.commit()
+    processed = 0
+    async with TelegramClient() as client, scoped_session() as session:
+        offset = await get_updates_offset(session)
+        while True:
+            updates = await client.get_updates(offset=offset, timeout=timeout, limit=UPDATES_LIMIT)
+            if not updates:
+                break
+            await link_users(get_new_ids(updates), session)
+            offset = updates[-1]["update_id"] + 1
+            await save_updates_offset(offset, session)
+            await session.commit()
+            processed += len(updates)
+            if len(updates) < UPDATES_LIMIT:
+                break
+            timeout = 0
+    return processed
 
 
-async def get_new_ids() -> dict:
+def get_new_ids(updates: list[dict]) -> dict:
     """
-    Fetches new Telegram chat IDs and user IDs from the Telegram API.
+    Extracts chat IDs and user IDs from Telegram updates.
 
-    Sends a request to the Telegram Bot API to retrieve updates.
-    Extracts chat IDs and user IDs from incoming messages, where
-    the user ID is expected to be in the message text.
+    The user ID is expected to be in the message text. IDs that cannot
+    be a user ID (not positive or beyond the integer column) are
+    ignored. When a user sent the code from several chats, the last
+    chat is kept.
 
-    :return: A dictionary mapping chat IDs to user IDs.
+    :param updates: Updates received from the Telegram API.
+    :return: A dictionary mapping user IDs to chat IDs.
              Returns an empty dictionary if no valid IDs are found.
     """
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/getUpdates"
-    resp = requests.get(url).json()
     ids: dict = {}
-    if resp is not None:
-        for msg in resp["result"]:
-            chat_id = msg["message"]["chat"]["id"]
-            text = msg["message"]["text"]
-            try:
-                user_id = int(text[4:])
-            except IndexError:
-                continue
-            except ValueError:
-                continue
-            ids[chat_id] = user_id
+    for update_data in updates:
+        message = update_data.get("message")
+        if not message or "text" not in message:
+            continue
+        chat_id = message["chat"]["id"]
+        text = message["text"]
+        try:
+            user_id = int(text[4:])
+        except ValueError:
+            continue
+        if not 0 < user_id <= MAX_USER_ID:
+            continue
+        ids[user_id] = chat_id
     return ids
+
+
+async def link_users(ids: dict[int, int], session: AsyncSession) -> None:
+    """
+    Saves the Telegram chat IDs of users with a single UPDATE ... FROM (VALUES ...).
+
+    Unknown user IDs are ignored.
+
+    :param ids: A dictionary mapping user IDs to chat IDs.
+    :param session: Asynchronous database session for executing operations.
+    """
+    if not ids:
+        return
+    links = values(column("user_id", Integer), column("chat_id", BigInteger), name="links").data(list(ids.items()))
+    await session.execute(
+        update(User)
+        .where(User.id == links.c.user_id)
+        .values(tg_chat_id=links.c.chat_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_updates_offset(session: AsyncSession) -> int | None:
+    """
+    Loads the identifier of the next expected Telegram update.
+
+    :param session: Asynchronous database session for executing operations.
+    :return: The identifier, or None if no update has been processed yet.
+    """
+    result = await session.execute(select(BotState.value).filter(BotState.key == UPDATES_OFFSET_KEY))
+    return result.scalar()
+
+
+async def save_updates_offset(offset: int, session: AsyncSession) -> None:
+    """
+    Saves the identifier of the next expected Telegram update.
+
+    :param offset: Identifier of the next expected update.
+    :param session: Asynchronous database session for executing operations.
+    """
+    statement = insert(BotState).values(key=UPDATES_OFFSET_KEY, value=offset)
+    await session.execute(
+        statement.on_conflict_do_update(index_elements=[BotState.key], set_={"value": statement.excluded.value})
+    )
@@ -1,8 +1,100 @@
-from scrappers.abw_by.abw_scrapper import AbwParser
-from scrappers.database_writers.writer import save_publications
+import asyncio
+import logging
 
+from config import PARSER_WORKERS, CRAWL_SHARD_PARALLEL
+from scrappers.base import SCRAPPERS, BaseParser
+from scrappers.database_writers.writer import save_publications, mark_inactive, get_crawl_cursor
 
-async def run():
-    abw = AbwParser()
-    abw_data = abw.get_data()
-    await save_publications(abw_data)
+# Importing the parsers registers them in SCRAPPERS.
+from scrappers.abw_by.abw_scrapper import AbwParser  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+async def run(full: bool = True, sites: list[str] | None = None):
+    """
+    Crawl the sites and save the publications.
+
+    All registered sites are crawled concurrently, each with its own
+    rate limits. A failure of one site is logged and does not affect
+    the others.
+
+    :param full: Whether to run a full crawl.
+    :param sites: Names of the sites to crawl, all registered sites by default.
+    """
+    names = sites or list(SCRAPPERS)
+    results = await asyncio.gather(*(run_site(SCRAPPERS[name](), full) for name in names), return_exceptions=True)
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.error("Crawl of %s failed", name, exc_info=result)
+
+
+async def run_site(parser: BaseParser, full: bool = True):
+    """
+    Crawl one site and save its publications.
+
+    A full crawl visits every page and deactivates publications that
+    disappeared from the site. An incremental crawl stops at already
+    known publications and saves only new or changed ones; it is small
+    enough to be parsed inline, without the process pool.
+
+    :param parser: Parser of the site.
+    :param full: Whether to run a full crawl.
+    """
+    cursor = None if full else await get_crawl_cursor(parser.SITE_NAME)
+    seen_ids = await save_publications(parser.iter_publications(cursor, workers=PARSER_WORKERS if full else 0))
+    if full and not parser.failed_pages:
+        await mark_inactive(parser.SITE_NAME, seen_ids)
+
+
+async def get_shards(site_name: str, shard_pages: int) -> list[tuple[int, int]]:
+    """
+    Split the pages of a site into ranges crawled by separate tasks.
+
+    :param site_name: Name of the site.
+    :param shard_pages: Number of pages in a shard.
+    :return: A list of ``(first_page, last_page)`` tuples, both inclusive.
+    """
+    pages = await SCRAPPERS[site_name]().get_pages_count()
+    return [(first, min(first + shard_pages - 1, pages)) for first in range(1, pages + 1, shard_pages)]
+
+
+async def run_shard(site_name: str, first_page: int, last_page: int, parallel: int = CRAWL_SHARD_PARALLEL) -> dict:
+    """
+    Crawl a range of pages of a site and save its publications.
+
+    Up to ``parallel`` shards of the site may run at the same time,
+    each in its own worker, so every shard is limited to an equal share
+    of the request rate and of the simultaneous requests of the site.
+
+    :param site_name: Name of the site.
+    :param first_page: First page of the range.
+    :param last_page: Last page of the range, inclusive.
+    :param parallel: Maximum number of shards running at the same time.
+    :return: A dictionary with the ids (on the site) of the saved publications
+             and the numbers of pages that could not be retrieved.
+    """
+    parser = SCRAPPERS[site_name](share=parallel)
+    pages = range(first_page, last_page + 1)
+    seen_ids = await save_publications(parser.iter_publications(workers=PARSER_WORKERS, pages=pages))
+    return {"seen_ids": list(seen_ids), "failed_pages": parser.failed_pages}
+
+
+async def finish_shards(site_name: str, results: list[dict]) -> None:
+    """
+    Deactivate publications missing from all shards of a full crawl.
+
+    Nothing is deactivated if any shard failed to retrieve a page, or
+    if there were no shards at all.
+
+    :param site_name: Name of the site.
+    :param results: Results of run_shard for every shard of the crawl.
+    """
+    if not results:
+        logger.warning("Full crawl of %s had no shards, nothing is deactivated", site_name)
+        return
+    failed_pages = [page for result in results for page in result["failed_pages"]]
+    if failed_pages:
+        logger.warning("%s pages of %s were not retrieved, nothing is deactivated", len(failed_pages), site_name)
+        return
+    await mark_inactive(site_name, {publication_id for result in results for publication_id in result["seen_ids"]})
@@ -0,0 +1,82 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Iterable, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+async def chunked(items: AsyncIterable[T] | Iterable[T], size: int) -> AsyncIterator[list[T]]:
+    """
+    Group items of a sync or async iterable into lists of a fixed size.
+
+    :param items: Items to group.
+    :param size: Maximum number of items in a chunk.
+    :return: An async iterator of chunks; the last one may be shorter.
+    """
+    chunk: list[T] = []
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def prefetch(items: AsyncIterable[T], size: int) -> AsyncIterator[T]:
+    """
+    Iterate an async iterable in a background task, ahead of the consumer.
+
+    The producer task pushes items into a bounded queue, so it runs at
+    most ``size`` items ahead of the consumer and waits when the
+    queue is full. Errors raised by the producer are re-raised in the
+    consumer.
+
+    :param items: Items to produce.
+    :param size: Maximum number of items waiting in the queue.
+    :return: An async iterator over the same items.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+    error: Exception | None = None
+
+    async def produce() -> None:
+        nonlocal error
+        try:
+            async for item in items:
+                await queue.put(item)
+        except Exception as e:
+            error = e
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not _END:
+            yield item
+        if error is not None:
+            raise error
+    finally:
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def aenumerate(items: AsyncIterable[T], start: int = 0) -> AsyncIterator[tuple[int, T]]:
+    """
+    Async counterpart of the built-in enumerate.
+
+    :param items: Items to enumerate.
+    :param start: Number of the first item.
+    :return: An async iterator of ``(number, item)`` tuples.
+    """
+    number = start
+    async for item in items:
+        yield number, item
+        number += 1
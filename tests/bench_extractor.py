@@ -0,0 +1,31 @@
+"""
+Micro-benchmark of the attribute extraction, before and after the single-pass extractor.
+
+Run from the root of the repository::
+
+    python -m tests.bench_extractor
+"""
+import json
+from timeit import repeat
+
+from scrappers.abw_by.extractor import extract_other_data
+from tests.build_other_data_corpus import CORPUS_PATH
+from tests.legacy_extractor import legacy_extract_other_data
+
+REPEAT = 5
+NUMBER = 20
+
+
+def bench(function, inputs: list[str]) -> float:
+    """Return the best per-item cost of a function in microseconds."""
+    best = min(repeat(lambda: [function(text) for text in inputs], repeat=REPEAT, number=NUMBER))
+    return best / (NUMBER * len(inputs)) * 1e6
+
+
+if __name__ == "__main__":
+    inputs = [case["input"] for case in json.loads(CORPUS_PATH.read_text(encoding="utf-8"))]
+    before = bench(legacy_extract_other_data, inputs)
+    after = bench(extract_other_data, inputs)
+    print(f"items: {len(inputs)}")
+    print(f"before: {before:.2f} us/item")
+    print(f"after:  {after:.2f} us/item ({before / after:.1f}x)")
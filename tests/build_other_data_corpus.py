@@ -0,0 +1,62 @@
+"""
+Build the golden corpus of the attribute extractor.
+
+The outputs are produced by the legacy regular expressions, so the
+corpus pins the behaviour the single-pass extractor must keep. Run
+from the root of the repository::
+
+    python -m tests.build_other_data_corpus
+"""
+import json
+import random
+from dataclasses import asdict
+from pathlib import Path
+
+from scrappers.abw_by.extractor import VOCABULARY
+from tests.legacy_extractor import legacy_extract_other_data
+
+CORPUS_PATH = Path(__file__).parent / "data" / "other_data_corpus.json"
+SEED = 20241018
+FUZZED_SAMPLES = 500
+
+SAMPLES = [
+    "",
+    "2016 г., механика, 1.6 л, бензин, седан, 187 000 км",
+    " 2016 г. механика 1.6 л бензин седан 187 000 км ",
+    "2019 г. автомат 2.0 л 190 л.с. дизель полный внедорожник 85 000 км",
+    "электро 150 л.с. автомат задний хэтчбек 12 000 км ",
+    " 2008 г. вариатор 1.8 л газ передний универсал 250 000 км ",
+    " микроавтобус/бус дизель 2.5 л механика задний 400 000 км ",
+    "1999 г., 2.5 л, 150 л.с., бензин, автомат, купе, 300000 км",
+    " гибрид 1.8 л 122 л.с. вариатор передний лифтбек 54 321 км ",
+    " гидроген 0 км робот минивен пикап кабриолет лимузин фургон ",
+]
+
+
+def fuzz(rng: random.Random) -> str:
+    """Return a random description made of vocabulary words, numbers, units and separators."""
+    tokens = list(VOCABULARY) + ["км", "л", "л.с.", "г.", ",", ".", "/", "бензинов", "седаны"]
+    parts = []
+    for _ in range(rng.randint(1, 12)):
+        choice = rng.random()
+        if choice < 0.4:
+            parts.append(rng.choice(tokens))
+        elif choice < 0.7:
+            number = str(rng.randint(0, 400000))
+            if rng.random() < 0.3:
+                number += rng.choice([".", " "]) + str(rng.randint(0, 999))
+            parts.append(number)
+        else:
+            parts.append(rng.choice(["", " ", ", ", "  ", "\n"]))
+    return rng.choice(["", " "]).join(parts) if rng.random() < 0.2 else " ".join(parts)
+
+
+def build() -> list[dict]:
+    rng = random.Random(SEED)
+    inputs = SAMPLES + [fuzz(rng) for _ in range(FUZZED_SAMPLES)]
+    return [{"input": text, "expected": asdict(legacy_extract_other_data(text))} for text in inputs]
+
+
+if __name__ == "__main__":
+    CORPUS_PATH.write_text(json.dumps(build(), ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Written {CORPUS_PATH}")
@@ -0,0 +1,55 @@
+"""
+Reference implementation of the attribute extraction used before the single-pass extractor.
+
+It is kept only to build the golden corpus and to benchmark the
+current implementation against it.
+"""
+import re
+
+from scrappers.data_classes import PublicationOtherData
+
+
+def legacy_extract_other_data(other_data: str) -> PublicationOtherData:
+    engine_type = ""
+    engine_hp = ""
+    engine_volume = ""
+    transmission_type = ""
+    drive = ""
+    mileage = ""
+    body_type = ""
+
+    if mileage_match := re.search(r"(\d+(\s\d+)?)\s*км", other_data):
+        mileage = mileage_match.group(1)
+
+    if engine_volume_match := re.search(r"(\d+(\.\d+)?)\s*л", other_data):
+        engine_volume = engine_volume_match.group(1)
+
+    if engine_hp_match := re.search(r"(\d+)\s*л\.с\.", other_data):
+        engine_hp = engine_hp_match.group(1)
+
+    if engine_type_match := re.search(r"(?<=\s)(бензин|дизель|электро|газ|гибрид|гидроген)(?=\s)", other_data):
+        engine_type = engine_type_match.group(0)
+
+    if transmission_type_match := re.search(r"(?<=\s)(автомат|механика|робот|вариатор)(?=\s)", other_data):
+        transmission_type = transmission_type_match.group(0)
+
+    if drive_match := re.search(r"(?<=\s)(полный|передний|задний)(?=\s)", other_data):
+        drive = drive_match.group(0)
+
+    pattern = re.compile(
+        r"""
+        (?<=\s)
+        (внедорожник|кабриолет|купе|лимузин|
+         лифтбек|микроавтобус/бус|минивен|пикап|
+         универсал|седан|фургон|хэтчбек)
+        (?=\s)
+    """,
+        re.VERBOSE,
+    )
+    if body_type_match := re.search(pattern, other_data):
+        body_type = body_type_match.group(0)
+
+    pub_other_data = PublicationOtherData(
+        engine_type, engine_hp, engine_volume, transmission_type, drive, mileage, body_type
+    )
+    return pub_other_data
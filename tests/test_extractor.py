@@ -0,0 +1,14 @@
+import json
+from dataclasses import asdict
+
+import pytest
+
+from scrappers.abw_by.extractor import extract_other_data
+from tests.build_other_data_corpus import CORPUS_PATH
+
+CORPUS = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=range(len(CORPUS)))
+def test_extract_other_data_matches_golden_corpus(case):
+    assert asdict(extract_other_data(case["input"])) == case["expected"]
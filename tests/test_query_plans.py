@@ -0,0 +1,198 @@
+"""
+Query plans of the API and writer queries on a seeded database.
+
+The tests run against a dedicated, migrated and empty database given
+by ``TEST_DATABASE_URL``, never against the database of the
+application. They seed it inside a transaction that is rolled back,
+run the real queries, capture the statements they send and check with
+EXPLAIN that the large tables are never read with a sequential scan.
+Empty tables, such as the price partitions of the following months,
+may be scanned. The tests are skipped when the database is not set,
+not available or not empty.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import event, text, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+# The application reads its database from the environment when it is imported,
+# point it at the test database too, so nothing can reach the live one.
+test_url = make_url(TEST_DATABASE_URL)
+os.environ.update(
+    DB_HOST=str(test_url.host),
+    DB_PORT=str(test_url.port or 5432),
+    DB_USER=str(test_url.username),
+    DB_PASS=str(test_url.password),
+    DB_NAME=str(test_url.database),
+)
+
+try:
+    from app.publications.services.favorites import get_favorites
+    from app.publications.services.publications import get_publications, get_one_publication, get_all_prices
+    from database.models import User
+    from scrappers.database_writers.writer import get_known_publications
+    from scrappers.notifications.sender import get_subscribers
+except Exception as e:
+    pytest.skip(f"the application cannot be imported: {e}", allow_module_level=True)
+
+PUBLICATIONS = 20000
+USERS = 2000
+FAVORITES = 20000
+CHECKED_TABLES = {
+    "publications",
+    "publication_prices",
+    "publication_images",
+    "favorites",
+    "users_favorites",
+    "users",
+}
+
+SEED = [
+    "INSERT INTO sites (id, name, url) VALUES (1, 'abw.by', 'https://abw.by')",
+    "INSERT INTO car_models (id, brand, model, generation) "
+    "SELECT n, 'brand', 'model ' || n, 'generation' FROM generate_series(1, 200) AS n",
+    "INSERT INTO publications (id, publication_id, publication_date, link, description, engine_type, engine_hp, "
+    "transmission_type, car_drive, mileage, is_active, current_price, current_price_date, site_id, car_model_id) "
+    "SELECT n, n, now(), 'https://abw.by/cars/' || n, 'description', 'бензин', '150', 'механика', 'передний', "
+    "'100 000', n % 10 <> 0, 1000 + n, now(), 1, n % 200 + 1 FROM generate_series(1, :publications) AS n",
+    "INSERT INTO publication_prices (price, price_date, publication_id) "
+    "SELECT 1000 + n, now() - make_interval(days => day), n "
+    "FROM generate_series(1, :publications) AS n, generate_series(0, 2) AS day",
+    "INSERT INTO publication_images (url, publication_id) "
+    "SELECT 'image ' || n || '-' || image, n "
+    "FROM generate_series(1, :publications) AS n, generate_series(1, 2) AS image",
+    "INSERT INTO users (id, username, email, hashed_password, is_active, is_superuser, is_verified, registered_at, "
+    "tg_chat_id) SELECT n, 'user' || n, 'user' || n || '@example.com', 'hash', true, false, false, now(), n "
+    "FROM generate_series(1, :users) AS n",
+    "INSERT INTO favorites (id, added_time, publication_id) "
+    "SELECT n, now(), n FROM generate_series(1, :favorites) AS n",
+    "INSERT INTO users_favorites (user_id, favorite_id) "
+    "SELECT n % :users + 1, n FROM generate_series(1, :favorites) AS n",
+]
+PARAMETERS = {"publications": PUBLICATIONS, "users": USERS, "favorites": FAVORITES}
+ANALYZE = [f"ANALYZE {table}" for table in sorted(CHECKED_TABLES | {"sites", "car_models"})]
+
+engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+
+
+async def is_empty() -> bool:
+    """
+    Check that the test database has the schema and no data.
+
+    :return: True if none of the seeded tables has rows.
+    """
+    async with engine.connect() as connection:
+        for table in sorted(CHECKED_TABLES | {"sites", "car_models"}):
+            result = await connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})"))
+            if result.scalar():
+                return False
+    return True
+
+
+try:
+    empty = asyncio.run(is_empty())
+except Exception as e:
+    pytest.skip(f"test database is not available: {e}", allow_module_level=True)
+if not empty:
+    pytest.skip("test database is not empty", allow_module_level=True)
+
+
+async def explain_queries(query) -> list[tuple[str, list[str]]]:
+    """
+    Run a query function on the seeded database and explain every statement it sent.
+
+    :param query: Coroutine function taking a session.
+    :return: A list of ``(statement, scanned tables)`` tuples.
+    """
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            for statement in SEED:
+                await connection.execute(text(statement), PARAMETERS)
+            for statement in ANALYZE:
+                await connection.execute(text(statement))
+            result = await connection.execute(
+                text("SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples > 0")
+            )
+            populated = set(result.scalars().all())
+
+            statements = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+
+            event.listen(connection.sync_connection, "before_cursor_execute", capture)
+            async with AsyncSession(bind=connection, join_transaction_mode="create_savepoint") as session:
+                await query(session)
+            event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+            plans = []
+            for statement, parameters in statements:
+                if statement.lstrip().upper().startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+                    continue
+                result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plans.append((statement, get_seq_scans(result.scalar()[0]["Plan"], populated)))
+            return plans
+        finally:
+            await transaction.rollback()
+
+
+def get_seq_scans(plan: dict, populated: set[str]) -> list[str]:
+    """
+    Return the checked non-empty tables read with a sequential scan anywhere in a plan.
+
+    :param plan: A plan node of EXPLAIN (FORMAT JSON).
+    :param populated: Names of the tables that have rows.
+    :return: Names of the scanned tables.
+    """
+    scans = []
+    if plan["Node Type"] == "Seq Scan":
+        relation = plan["Relation Name"]
+        checked = relation in CHECKED_TABLES or relation.startswith("publication_prices_")
+        if checked and relation in populated:
+            scans.append(relation)
+    for child in plan.get("Plans", []):
+        scans.extend(get_seq_scans(child, populated))
+    return scans
+
+
+def assert_no_seq_scans(query) -> None:
+    plans = asyncio.run(explain_queries(query))
+    assert plans
+    for statement, scans in plans:
+        assert not scans, f"Sequential scan of {scans} in:\n{statement}"
+
+
+def test_get_publications_first_page():
+    assert_no_seq_scans(lambda session: get_publications(0, 20, session))
+
+
+def test_get_publications_far_page():
+    assert_no_seq_scans(lambda session: get_publications(500, 20, session))
+
+
+def test_get_one_publication():
+    assert_no_seq_scans(lambda session: get_one_publication(12345, False, session))
+
+
+def test_get_all_prices():
+    assert_no_seq_scans(lambda session: get_all_prices(12345, False, session))
+
+
+def test_get_favorites():
+    assert_no_seq_scans(lambda session: get_favorites(User(id=42), session))
+
+
+def test_get_known_publications():
+    assert_no_seq_scans(lambda session: get_known_publications({1}, list(range(5000, 5500)), session))
+
+
+def test_get_subscribers():
+    assert_no_seq_scans(lambda session: get_subscribers(list(range(700, 800)), session))
@@ -1,16 +1,26 @@
 import asyncio
 import logging
+import threading
 from datetime import timedelta
 
 from celery.signals import after_setup_logger, worker_ready
 
-from celery import Celery
+from celery import Celery, chord
 
-from config import REDIS_HOST, REDIS_PORT
+from config import REDIS_HOST, REDIS_PORT, CRAWL_FULL_INTERVAL, CRAWL_SHARD_PAGES, TG_WEBHOOK_SECRET
+from database.database import engine
+from scrappers.notifications.dispatcher import dispatch_notifications
 from scrappers.notifications.tg.tg import update_user_tg_ids
-from scrappers.run import run
+from scrappers.base import SCRAPPERS
+from scrappers.database_writers.maintenance import (
+    create_price_partitions,
+    rollup_prices,
+    archive_publications,
+    purge_notifications,
+)
+from scrappers.run import run, get_shards, run_shard, finish_shards
 
-celery = Celery("tasks", broker=f"redis://{REDIS_HOST}:{REDIS_PORT}/")
+celery = Celery("tasks", broker=f"redis://{REDIS_HOST}:{REDIS_PORT}/", backend=f"redis://{REDIS_HOST}:{REDIS_PORT}/")
 
 celery.conf.update(
     timezone="UTC",
@@ -30,33 +40,130 @@ def setup_loggers(logger, *args, **kwargs):
     logger.addHandler(fh)
 
 
-loop = asyncio.get_event_loop()
+engine_lock = threading.Lock()
+engine_ready = False
+
+
+def run_async(coroutine):
+    """
+    Run a coroutine in a new event loop.
+
+    Tasks are executed in a thread pool, so each task gets its own loop.
+    The first connection of the database engine initializes the dialect
+    and must not be made by parallel tasks, so it is made once under a lock.
+
+    :param coroutine: Coroutine to run.
+    :return: Result of the coroutine.
+    """
+    global engine_ready
+    with engine_lock:
+        if not engine_ready:
+            try:
+                asyncio.run(connect_engine())
+            except Exception:
+                coroutine.close()
+                raise
+            engine_ready = True
+    return asyncio.run(coroutine)
+
+
+async def connect_engine():
+    async with engine.connect():
+        pass
 
 
 @celery.task
 def run_upd_tg():
-    result = loop.run_until_complete(update_user_tg_ids())
+    result = run_async(update_user_tg_ids())
+    return result
+
+
+@celery.task
+def run_dispatch_notifications():
+    result = run_async(dispatch_notifications())
     return result
 
 
 @celery.task
 def run_parse():
-    result = loop.run_until_complete(run())
+    result = run_async(run(full=False))
+    return result
+
+
+@celery.task
+def run_full_parse():
+    if CRAWL_SHARD_PAGES:
+        for site_name in SCRAPPERS:
+            run_sharded_parse.delay(site_name)
+        return
+    result = run_async(run(full=True))
+    return result
+
+
+@celery.task
+def run_sharded_parse(site_name: str):
+    shards = run_async(get_shards(site_name, CRAWL_SHARD_PAGES))
+    header = [run_parse_shard.s(site_name, first, last) for first, last in shards]
+    chord(header)(finish_parse_shards.s(site_name))
+
+
+@celery.task
+def run_parse_shard(site_name: str, first_page: int, last_page: int):
+    result = run_async(run_shard(site_name, first_page, last_page))
+    return result
+
+
+@celery.task
+def finish_parse_shards(results: list[dict], site_name: str):
+    result = run_async(finish_shards(site_name, results))
     return result
 
+
+@celery.task
+def run_price_maintenance():
+    partitions = run_async(create_price_partitions())
+    deleted = run_async(rollup_prices())
+    purged = run_async(purge_notifications())
+    return {"partitions": partitions, "deleted_prices": deleted, "deleted_notifications": purged}
+
+
+@celery.task
+def run_archive():
+    result = run_async(archive_publications())
+    return result
+
+
 @worker_ready.connect
 def at_start(sender, **k):
     with sender.app.connection() as conn:
-        sender.app.send_task('worker.worker.run_parse', connection=conn,)
+        sender.app.send_task('worker.worker.run_full_parse', connection=conn,)
 
 
 celery.conf.beat_schedule = {
-    "run_upd_tg": {
-        "task": "worker.worker.run_upd_tg",
-        "schedule": timedelta(hours=1),  # Every 1 hour
+    "run_dispatch_notifications": {
+        "task": "worker.worker.run_dispatch_notifications",
+        "schedule": timedelta(minutes=1),  # Every 1 minute
     },
     "run_parse": {
         "task": "worker.worker.run_parse",
         "schedule": timedelta(hours=1),  # Every 1 hour
     },
+    "run_full_parse": {
+        "task": "worker.worker.run_full_parse",
+        "schedule": timedelta(hours=CRAWL_FULL_INTERVAL),
+    },
+    "run_price_maintenance": {
+        "task": "worker.worker.run_price_maintenance",
+        "schedule": timedelta(days=1),  # Every day
+    },
+    "run_archive": {
+        "task": "worker.worker.run_archive",
+        "schedule": timedelta(days=1),  # Every day
+    },
 }
+
+if not TG_WEBHOOK_SECRET:
+    celery.conf.beat_schedule["run_upd_tg"] = {
+        "task": "worker.worker.run_upd_tg",
+        "schedule": timedelta(hours=1),  # Every 1 hour
+    }